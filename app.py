@@ -4,15 +4,38 @@
 작성자: Key 교수님
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory, send_file, jsonify, g
+from flask import before_render_template, template_rendered
+import click
+import io
+import json
+import logging
 import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename   # ✅ 추가
+
+import auth
+import bundles
+import filestore
+import metrics
+import previews
+import search
+import sessions
+import storage
+from auth import is_professor, login_required, professor_required
+
+metrics.setup_logging()
+log = logging.getLogger("hwat25.app")
 
 
 app = Flask(__name__)
-app.secret_key = "key_flask_secret"
+# 서명 키는 코드에 두지 않는다: SECRET_KEY 환경변수 또는 처음 실행 시 만든 .secret_key 파일
+app.secret_key = sessions.load_secret_key(os.environ.get("SECRET_KEY_FILE", ".secret_key"))
 
 # ───────────── 세션 안정화 (Render HTTPS 환경 대응) ─────────────
 app.config.update(
@@ -23,54 +46,450 @@ app.config.update(
 
 # ───────────── 설정 ─────────────
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+UPLOAD_STAGING = os.path.join(UPLOAD_FOLDER, ".partial")                    # 청크 업로드 임시 보관
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, ".blobs")                         # 내용 해시별 실제 파일
+BLOB_SCAN_REPORT = os.path.join(BLOB_FOLDER, ".scan.json")                  # 마지막 파일 점검 결과
+PREVIEW_FOLDER = os.path.join(UPLOAD_FOLDER, ".previews")                   # 내용 해시별 미리보기 (썸네일/쪽수/발췌)
+PREVIEW_WORKERS = int(os.environ.get("PREVIEW_WORKERS", 2))                 # 워커 프로세스당 미리보기 생성 스레드 수
+MAX_FILE_BYTES = int(os.environ.get("MAX_FILE_MB", 300)) * 1024 * 1024      # 파일 1개 상한
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_MB", 64)) * 1024 * 1024  # 요청 1건 상한 (큰 파일은 청크 업로드)
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024                                        # 청크 업로드 1회 크기
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+
+# ✅ 다운로드 캐시/전송 위임 설정
+#   DOWNLOAD_OFFLOAD = ""          → gunicorn 워커가 직접 전송 (Range/304 지원)
+#                    = "x-sendfile" → X-Sendfile 헤더 (Apache mod_xsendfile 등)
+#                    = "x-accel"    → X-Accel-Redirect 헤더 (nginx), 예:
+#                        location /_protected_uploads/ { internal; alias <UPLOAD_FOLDER>/.blobs/; }
+#   /uploads/<이름> 은 이름 주소라 같은 이름이 나중에 다른 내용을 가리킬 수 있다 (삭제 후 같은 이름 재업로드)
+#   → 매번 재검증(no-cache)하고 ETag(내용 해시)가 같으면 304. 내용 해시 주소(/previews/<sha>)만 오래 캐시.
+DOWNLOAD_CACHE_CONTROL = os.environ.get("DOWNLOAD_CACHE_CONTROL", "private, no-cache")
+PREVIEW_CACHE_CONTROL = os.environ.get("PREVIEW_CACHE_CONTROL", "private, max-age=86400")
+DOWNLOAD_OFFLOAD = os.environ.get("DOWNLOAD_OFFLOAD", "")
+X_ACCEL_PREFIX = os.environ.get("X_ACCEL_PREFIX", "/_protected_uploads")
+app.config["USE_X_SENDFILE"] = DOWNLOAD_OFFLOAD == "x-sendfile"
 DATA_LECTURE = "lecture_data.csv"
 DATA_QUESTIONS = "questions.csv"
 DATA_COMMENTS = "comments.csv"
 DATA_UPLOADS = "uploads_data.csv"     # ✅ 업로드 전용 CSV
 DATA_POSTS = "posts_data.csv"         # ✅ 학습사이트 게시 전용 CSV
+DATA_FILES = "files_data.csv"         # ✅ 파일명 → 내용 해시 목록
 ALLOWED_EMAILS = "allowed_emails.txt"
+POST_RETENTION_DAYS = 15                                          # 게시자료 보관 기간
+PRUNE_INTERVAL = int(os.environ.get("PRUNE_INTERVAL", 3600))     # 만료 정리 주기(초), 0이면 CLI로만 정리
+QUESTIONS_PAGE_SIZE = int(os.environ.get("QUESTIONS_PAGE_SIZE", 20))   # 한 번에 보여줄 질문 수
+MANIFEST_RESCAN_INTERVAL = int(os.environ.get("MANIFEST_RESCAN_INTERVAL", 1800))   # 파일 목록 점검 주기(초), 0이면 CLI로만
+SEARCH_PAGE_SIZE = 10                                                             # 검색 결과 한 페이지
+MANIFEST_PAGE_SIZE = 200                                                          # /check_data 한 페이지 파일 수
+
+# ✅ 저장소: sqlite(기본, WAL) 또는 csv(기존 방식)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite")
+DB_PATH = os.environ.get("DB_PATH", "hwat25.db")
+READ_CACHE_MAX_BYTES = int(os.environ.get("READ_CACHE_MAX_BYTES", 32 * 1024 * 1024))   # 워커당 읽기 캐시 상한
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", DB_PATH)                            # 서버 세션 (SQLite)
+SESSION_SWEEP_INTERVAL = int(os.environ.get("SESSION_SWEEP_INTERVAL", 300))              # 만료 세션 정리 주기(초)
+PARTIAL_UPLOAD_MAX_AGE = int(os.environ.get("PARTIAL_UPLOAD_MAX_AGE", 86400))             # 중단된 청크 업로드 보관(초)
+CSV_PATHS = {
+    "posts": DATA_POSTS,
+    "uploads": DATA_UPLOADS,
+    "questions": DATA_QUESTIONS,
+    "comments": DATA_COMMENTS,
+    "files": DATA_FILES,
+}
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+chunked_uploads = filestore.ChunkedUploads(UPLOAD_STAGING, MAX_FILE_BYTES)
+blobs = filestore.BlobStore(BLOB_FOLDER)
+file_previews = previews.Previews(PREVIEW_FOLDER, blobs, PREVIEW_WORKERS)
+session_store = sessions.SessionStore(SESSION_DB_PATH)
+app.session_interface = sessions.SqliteSessionInterface(session_store)
 
 
-# ───────────── CSV 로드/저장 ─────────────
-def load_csv(path, cols):
-    """CSV 안전 로드 (헤더 오류 시 자동 초기화)"""
-    if os.path.exists(path):
-        try:
-            df = pd.read_csv(path)
-            if df.empty or list(df.columns) != cols:
-                return pd.DataFrame(columns=cols)
-            return df
-        except Exception as e:
-            print(f"[CSV Load Error] {e}")
-            return pd.DataFrame(columns=cols)
-    else:
-        return pd.DataFrame(columns=cols)
+def apply_role_changes(changes):
+    """허용 목록 변경을 로그인 중인 세션에 바로 반영 (삭제된 이메일은 세션 폐기, 같은 역할이면 그대로)"""
+    for email, role in changes.items():
+        n = session_store.revoke(email) if role is None else session_store.set_role(email, role)
+        if n:
+            log.info("세션 역할 갱신", extra={"email": email, "role": role, "sessions": n})
 
 
-def save_csv(path, df):
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    df.to_csv(path, index=False, encoding="utf-8-sig")
+allow_list = auth.AllowList(ALLOWED_EMAILS, on_change=apply_role_changes, known=session_store.emails)
+store = storage.open_store(STORAGE_BACKEND, DB_PATH, CSV_PATHS, READ_CACHE_MAX_BYTES)
+search_index = search.SearchIndex()   # 검색할 때 버전이 바뀐 테이블을 훑어 바뀐 문서만 다시 색인 (diff on read)
 
 
 # ───────────── 공용 함수 ─────────────
-def get_professor_email():
-    """allowed_emails.txt의 첫 줄(교수 이메일)을 반환"""
-    if os.path.exists(ALLOWED_EMAILS):
-        with open(ALLOWED_EMAILS, "r", encoding="utf-8") as f:
-            for line in f:
-                email = line.strip()
-                if email:
-                    return email
-    return None
+def post_cutoff():
+    """보관 기간의 첫 날짜 ("YYYY-MM-DD") — 이 날짜보다 앞선 게시자료는 만료"""
+    return (datetime.now() - timedelta(days=POST_RETENTION_DAYS)).strftime("%Y-%m-%d")
+
+
+def prune_expired_posts():
+    """만료된 게시자료 삭제 (삭제할 행이 있을 때만 저장소에 쓴다)"""
+    cutoff = post_cutoff()
+    expired_files = [f for p in store.rows("posts") if p["date"] < cutoff for f in split_files(p["files"])]
+    removed = store.prune_before("posts", "date", cutoff)
+    if removed:
+        release_files(expired_files)
+        log.info("만료 게시자료 삭제", extra={"removed": removed, "cutoff": cutoff})
+    return removed
+
+
+def sweep_sessions():
+    """만료 세션 삭제 + 허용 목록 변경 확인 (변경 시 로그인 중인 세션의 역할도 갱신)"""
+    allow_list.refresh()
+    removed = session_store.sweep()
+    if removed:
+        log.info("만료 세션 정리", extra={"removed": removed})
+    return removed
+
+
+def sweep_partial_uploads():
+    """PARTIAL_UPLOAD_MAX_AGE 동안 이어 쓰지 않은 청크 업로드 정리"""
+    removed = chunked_uploads.sweep(PARTIAL_UPLOAD_MAX_AGE)
+    if removed:
+        log.info("중단된 업로드 정리", extra={"removed": removed})
+    return removed
+
+
+_jobs_pid = None
+_jobs_lock = threading.Lock()
+
+
+def _repeat(job, interval, what):
+    while True:
+        try:
+            job()
+        except Exception:
+            log.exception(f"{what} 실패")
+        time.sleep(interval)
+
+
+@app.before_request
+def start_background_jobs():
+    # 워커 프로세스마다 한 번만 백그라운드 스레드 시작 (만료 게시자료·중단된 업로드 정리, 파일 목록 점검, 세션 정리)
+    global _jobs_pid
+    if _jobs_pid == os.getpid():
+        return
+    with _jobs_lock:   # gthread 워커의 여러 스레드가 동시에 들어와도 한 번만
+        if _jobs_pid != os.getpid():
+            _jobs_pid = os.getpid()
+            jobs = [
+                (prune_expired_posts, PRUNE_INTERVAL, "post-pruner", "만료 게시자료 정리"),
+                (sweep_partial_uploads, PRUNE_INTERVAL, "upload-sweeper", "중단된 업로드 정리"),
+                (rescan_files, MANIFEST_RESCAN_INTERVAL, "file-rescan", "파일 목록 점검"),
+                (sweep_sessions, SESSION_SWEEP_INTERVAL, "session-sweeper", "만료 세션 정리"),
+            ]
+            for job, interval, name, what in jobs:
+                if interval > 0:
+                    threading.Thread(target=_repeat, args=(job, interval, what), name=name, daemon=True).start()
+
+
+_comments_index = (None, {})
+
+
+def comments_by_question():
+    """question_id → 댓글 목록 (댓글 테이블 버전이 바뀔 때만 한 번에 다시 묶음)"""
+    global _comments_index
+    version = store.version("comments")
+    if _comments_index[0] != version or version is None:
+        grouped = {}
+        for c in store.rows("comments"):
+            grouped.setdefault(c["question_id"], []).append(c)
+        _comments_index = (version, grouped)
+    return _comments_index[1]
+
+
+def question_page(after):
+    """after 다음 질문 QUESTIONS_PAGE_SIZE건과 다음 커서 (더 없으면 None)"""
+    page = storage.rows_after(store, "questions", after, QUESTIONS_PAGE_SIZE + 1)
+    next_after = page[QUESTIONS_PAGE_SIZE - 1]["id"] if len(page) > QUESTIONS_PAGE_SIZE else None
+    return page[:QUESTIONS_PAGE_SIZE], next_after
+
+
+# ───────────── 업로드 파일 (내용 해시 저장소 + 참조 수) ─────────────
+# 실제 파일은 uploads/.blobs/<sha256> 에 한 번만 저장하고, files 테이블이 파일명 → 해시를 연결한다.
+# uploads/posts 행의 files 열이 파일명을 참조하며, 마지막 참조가 사라질 때만 파일을 지운다.
+def split_files(value):
+    return [f.strip() for f in str(value or "").split(";") if f.strip()]
+
+
+def register_file(name, sha256, size):
+    """파일명 → 해시 등록. 같은 이름에 다른 내용이면 새 이름(_2, _3 …)으로 등록해 기존 자료를 덮어쓰지 않는다."""
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while True:
+        entry = store.find("files", name=candidate)
+        if entry and entry[0]["sha256"] == sha256:
+            return candidate
+        if not entry:
+            try:
+                store.insert("files", {
+                    "name": candidate,
+                    "sha256": sha256,
+                    "size": size,
+                    "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                    "mtime": blob_mtime(sha256),
+                })
+                return candidate
+            except sqlite3.IntegrityError:
+                continue   # 다른 워커가 같은 이름을 먼저 등록 → 다시 확인 (CSV 저장소도 같은 예외)
+        n += 1
+        candidate = f"{stem}_{n}{ext}"
+
+
+def blob_mtime(sha256):
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(blobs.path(sha256))).strftime("%Y-%m-%d %H:%M:%S")
+    except OSError:
+        return ""
+
+
+def file_refcounts():
+    """파일명별 참조 수 (업로드 목록 + 게시자료)"""
+    counts = Counter()
+    for table in ("uploads", "posts"):
+        for row in store.rows(table):
+            counts.update(split_files(row["files"]))
+    return counts
+
+
+def release_files(names):
+    """더 이상 어떤 행도 참조하지 않는 파일명을 정리하고, 그 해시를 쓰는 이름이 없으면 실제 파일도 삭제"""
+    counts = file_refcounts()
+    for name in set(names):
+        if counts[name]:
+            continue
+        for entry in store.find("files", name=name):
+            store.delete("files", entry["id"])
+            if not store.find("files", sha256=entry["sha256"]):
+                blobs.remove(entry["sha256"])
+                file_previews.remove(entry["sha256"])
+                log.info("참조 없는 파일 삭제", extra={"file": name, "sha256": entry["sha256"]})
+        legacy = os.path.join(UPLOAD_FOLDER, name)   # 이전 방식으로 저장된 파일
+        if filestore.safe_name(name) == name and os.path.isfile(legacy):
+            os.remove(legacy)
+
+
+# ───────────── 파일 목록(manifest) ─────────────
+#   files 테이블 = 업로드/삭제 시 바로 갱신되는 목록 (이름, 해시, 크기, mtime)
+#   rescan_files = 실제 해시 저장소와 대조해 크기/mtime을 바로잡고, 빠진 파일·연결 없는 파일을 기록
+def rescan_files(force=False):
+    """해시 저장소 점검 — 여러 워커 중 한 곳만, 주기의 절반 안에 점검했으면 건너뜀"""
+    with storage.file_lock(BLOB_SCAN_REPORT):
+        last = read_scan_report()
+        if not force and last and time.time() - last["time"] < MANIFEST_RESCAN_INTERVAL / 2:
+            return last
+        on_disk = {sha: (size, mtime) for sha, size, mtime in blobs.scan()}
+        fixed, missing, known = 0, [], set()
+        for entry in store.rows("files"):
+            known.add(entry["sha256"])
+            stat = on_disk.get(entry["sha256"])
+            if stat is None:
+                missing.append(entry["name"])
+                continue
+            mtime = datetime.fromtimestamp(stat[1]).strftime("%Y-%m-%d %H:%M:%S")
+            if entry["size"] != stat[0] or entry["mtime"] != mtime:
+                store.update("files", entry["id"], {"size": stat[0], "mtime": mtime})
+                fixed += 1
+        report = {
+            "time": time.time(),
+            "blobs": len(on_disk),
+            "bytes": sum(size for size, _ in on_disk.values()),
+            "fixed": fixed,
+            "missing": sorted(missing),
+            "stray": [
+                {"sha256": sha, "size": size, "mtime": datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")}
+                for sha, (size, mtime) in sorted(on_disk.items()) if sha not in known
+            ],
+        }
+        fd, tmp = tempfile.mkstemp(dir=BLOB_FOLDER, prefix=".scan-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False)
+        os.replace(tmp, BLOB_SCAN_REPORT)
+    log.info("파일 목록 점검", extra={k: report[k] for k in ("blobs", "fixed")} | {
+        "missing": len(report["missing"]), "stray": len(report["stray"])})
+    return report
+
+
+def read_scan_report():
+    try:
+        with open(BLOB_SCAN_REPORT, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_manifest = (None, None)
+
+
+def file_manifest():
+    """파일별 크기/해시/mtime + 참조하는 게시자료·업로드 자료 (관련 테이블·점검 결과가 바뀔 때만 다시 계산)"""
+    global _manifest
+    try:
+        scan_stamp = os.path.getmtime(BLOB_SCAN_REPORT)
+    except OSError:
+        scan_stamp = None
+    version = (store.version("files"), store.version("posts"), store.version("uploads"), scan_stamp)
+    if _manifest[0] == version:
+        return _manifest[1]
+    refs = {}
+    for table in ("posts", "uploads"):
+        for row in store.rows(table):
+            for name in split_files(row["files"]):
+                refs.setdefault(name, {"posts": [], "uploads": []})[table].append(row)
+    report = read_scan_report() or {}
+    missing = set(report.get("missing", []))
+    entries = []
+    for e in store.rows("files"):
+        r = refs.get(e["name"], {"posts": [], "uploads": []})
+        entries.append(dict(
+            e,
+            posts=[{"id": p["id"], "title": p["title"]} for p in r["posts"]],
+            uploads=[u["id"] for u in r["uploads"]],
+            refs=len(r["posts"]) + len(r["uploads"]),
+            orphan=not (r["posts"] or r["uploads"]),
+            missing=e["name"] in missing,
+        ))
+    manifest = {
+        "entries": entries,
+        "stray": report.get("stray", []),
+        "scanned": datetime.fromtimestamp(report["time"]).strftime("%Y-%m-%d %H:%M:%S") if report else None,
+        "total_bytes": sum(e["size"] or 0 for e in entries),
+        "orphans": sum(1 for e in entries if e["orphan"]),
+        "missing": len(missing),
+    }
+    _manifest = (version, manifest)
+    return manifest
+
+
+def save_uploaded_files(file_list):
+    """업로드 파일을 스트리밍 저장하고 등록된 파일명 목록 반환 (청크 단위 기록 + SHA-256 중복 제거)"""
+    names = []
+    for f in file_list:
+        if f and f.filename:
+            fname = filestore.safe_name(f.filename)
+            if not fname:
+                continue
+            size, sha256 = filestore.save_stream(f.stream, blobs, MAX_FILE_BYTES)
+            fname = register_file(fname, sha256, size)
+            log.info("파일 업로드", extra={"file": fname, "size": size, "sha256": sha256})
+            file_previews.submit(sha256, fname)   # 미리보기는 백그라운드에서 (응답을 기다리게 하지 않음)
+            names.append(fname)
+    return names
+
+
+def previews_for(rows):
+    """게시자료 파일명 → 미리보기 정보. 아직 없는 파일은 생성을 요청만 한다 (예전에 올린 파일도 처음 조회 때 만들어짐)"""
+    hashes = {e["name"]: e["sha256"] for e in store.rows("files")}
+    result = {}
+    for row in rows:
+        for name in split_files(row["files"]):
+            sha256 = hashes.get(name)
+            if not sha256:
+                continue
+            meta = file_previews.get(sha256)
+            if meta is None:
+                file_previews.submit(sha256, name)
+            elif meta["pages"] or meta["thumb"] or meta["text"]:
+                result[name] = meta
+    return result
+
+
+def chunked_file_names(value):
+    """청크 업로드로 이미 등록된 파일명 (';' 구분) 중 실제 존재하는 것만"""
+    return [n for n in split_files(value) if store.find("files", name=n)]
+
+
+def link_legacy_posts():
+    """upload_id가 없는 예전 게시자료를 업로드 자료와 연결 (정규화 제목+날짜, 없으면 유일한 정규화 제목)"""
+    unlinked = store.find("posts", upload_id=None)
+    if not unlinked:
+        return 0
+    by_title_date, by_title = {}, {}
+    for up in store.rows("uploads"):
+        key = storage.title_key(up["title"])
+        by_title_date.setdefault((key, up["date"]), up["id"])
+        by_title.setdefault(key, []).append(up["id"])
+    taken = {p["upload_id"] for p in store.rows("posts") if p["upload_id"]}
+    linked = 0
+    for post in unlinked:
+        up_id = by_title_date.get((post["title_key"], post["date"]))
+        if up_id is None and len(by_title.get(post["title_key"], [])) == 1:
+            up_id = by_title[post["title_key"]][0]
+        if up_id is not None and up_id not in taken:
+            store.update("posts", post["id"], {"upload_id": up_id})
+            taken.add(up_id)
+            linked += 1
+    log.info("예전 게시자료 연결", extra={"unlinked": len(unlinked), "linked": linked})
+    return linked
+
+
+def startup_check():
+    """기동 점검 — 문제 목록 반환 (gunicorn post_worker_init, flask check-startup, python app.py 공용)"""
+    problems = []
+    link_legacy_posts()
+    for folder in (UPLOAD_FOLDER, BLOB_FOLDER, UPLOAD_STAGING, PREVIEW_FOLDER):
+        if not os.access(folder, os.W_OK):
+            problems.append(f"쓰기 불가 폴더: {folder}")
+    if store.backend == "sqlite" and store.journal_mode().lower() != "wal":
+        problems.append(f"SQLite WAL 모드 아님 ({store.journal_mode()}) — 여러 워커 동시 쓰기 시 대기 발생")
+    if store.backend == "csv" and storage.fcntl is None:
+        problems.append("fcntl 없음 — CSV 저장소는 단일 워커로만 실행하세요")
+    if not allow_list.professor_email():
+        problems.append(f"{ALLOWED_EMAILS}에 교수 이메일이 없습니다")
+    return problems
 
 
 # ───────────── 템플릿 변수 주입 ─────────────
 @app.context_processor
 def inject_is_professor():
-    email = session.get("email")
-    return dict(is_professor=(email == get_professor_email()))
+    return dict(is_professor=is_professor())
+
+
+# ───────────── 요청/렌더링 시간 계측 ─────────────
+def _observe_request(status):
+    if "t0" not in g or g.get("observed"):
+        return
+    g.observed = True
+    metrics.registry.observe(
+        "hwat25_http_request_seconds", time.perf_counter() - g.t0,
+        endpoint=request.endpoint or "unknown", method=request.method, status=f"{status // 100}xx",
+    )
+
+
+@app.before_request
+def start_timer():
+    g.t0 = time.perf_counter()
+
+
+@app.after_request
+def record_timing(response):
+    # 파일 본문 전송(스트리밍)은 응답 반환 이후이므로 여기에는 헤더 준비까지의 시간만 포함된다
+    _observe_request(response.status_code)
+    return response
+
+
+@app.teardown_request
+def record_failed_request(exc):
+    if exc is not None:
+        _observe_request(500)
+
+
+def _render_started(sender, template, context, **extra):
+    g.setdefault("render_starts", []).append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    starts = g.get("render_starts")
+    if starts:
+        metrics.registry.observe(
+            "hwat25_template_render_seconds", time.perf_counter() - starts.pop(), template=template.name or "string"
+        )
+
+
+before_render_template.connect(_render_started, app)
+template_rendered.connect(_render_finished, app)
 
 
 # ───────────── 기본 라우트 ─────────────
@@ -80,47 +499,105 @@ def index():
 
 
 @app.route("/lecture")
+@login_required
 def lecture():
-    # ✅ 로그인 세션 확인 (email 기반)
-    email = session.get("email")
-    if not email:
-        flash("🔒 로그인 후 이용 가능합니다.", "warning")
-        return redirect(url_for("login"))
-
-
-    df_posts = load_csv(DATA_POSTS, ["title", "content", "files", "links", "date", "confirmed"])
-    df_posts = df_posts.fillna('')
-    today = datetime.now()
-
-    # ✅ 15일 지난 자료 자동 제거
-    recent_posts = []
-    for _, row in df_posts.iterrows():
-        try:
-            date_str = str(row.get("date", "")).split()[0]
-            if not date_str or date_str.lower() == "nan":
-                continue
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            if (today - d).days <= 15:
-                recent_posts.append(row)
-        except Exception as e:
-            print(f"[LECTURE ERROR] {e} / row={row}")
-            continue
-
-    df_posts = pd.DataFrame(recent_posts, columns=["title", "content", "files", "links", "date", "confirmed"])
-    save_csv(DATA_POSTS, df_posts)
-    lectures = df_posts.to_dict("records")
+    # ✅ 15일 지난 자료는 숨김 (삭제는 prune_expired_posts가 담당, GET은 읽기 전용)
+    cutoff = post_cutoff()
+    lectures = [row for row in store.rows("posts") if row["date"] >= cutoff]
 
-    df_questions = load_csv(DATA_QUESTIONS, ["id", "title", "content", "email", "date"])
-    df_comments = load_csv(DATA_COMMENTS, ["question_id", "comment", "email", "date"])
+    # 🟦 질문은 커서(after) 다음 한 페이지만, 댓글은 질문별로 미리 묶어서 전달
+    questions, next_after = question_page(request.args.get("after", 0, type=int))
 
     return render_template(
         "lecture.html",
         lectures=lectures,
-        questions=df_questions.to_dict("records"),
-        comments=df_comments.to_dict("records"),
+        previews=previews_for(lectures),
+        questions=questions,
+        comments_by_q=comments_by_question(),
+        next_after=next_after,
     )
 
 
+# 🔎 강의자료·질문·댓글 검색
+SEARCH_KINDS = {"post": "강의자료", "question": "질문", "comment": "댓글"}
+
+
+def run_search(query, kind, page):
+    with metrics.timer("hwat25_search_seconds"):
+        search_index.sync(store)
+        cutoff = post_cutoff()
+        return search_index.search(
+            query,
+            kinds={kind} if kind in SEARCH_KINDS else None,
+            page=page,
+            per_page=SEARCH_PAGE_SIZE,
+            accept=lambda d: d["kind"] != "post" or d["date"] >= cutoff,   # 보관 기간이 지난 게시자료 제외
+        )
+
+
+def search_link(doc):
+    """결과 → /lecture 안의 위치 (질문은 그 질문부터 시작하는 페이지)"""
+    if doc["kind"] == "post":
+        return url_for("lecture", _anchor=f"post-{doc['id']}")
+    q_id = doc["id"] if doc["kind"] == "question" else doc["question_id"]
+    return url_for("lecture", after=q_id - 1, _anchor=f"q-{q_id}")
+
+
+@app.route("/search")
+@login_required
+def search_page():
+    query = request.args.get("q", "").strip()
+    kind = request.args.get("type", "all")
+    page = max(request.args.get("page", 1, type=int), 1)
+    results, total = run_search(query, kind, page) if query else ([], 0)
+    for r in results:
+        r["link"] = search_link(r)
+    return render_template(
+        "search.html",
+        q=query,
+        kind=kind,
+        kinds=SEARCH_KINDS,
+        results=results,
+        total=total,
+        page=page,
+        pages=(total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE,
+    )
+
+
+@app.route("/api/search")
+@login_required(api=True)
+def api_search():
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    results, total = run_search(query, request.args.get("type", "all"), page) if query else ([], 0)
+    for r in results:
+        r["link"] = search_link(r)
+        r["snippet"] = "".join(text for text, _ in r["snippet"])
+    return jsonify(q=query, page=page, total=total, results=results)
+
+
+# ✅ Q&A 증분 조회 API
+#   /api/questions?after=<질문 id>            → 그 다음 질문 한 페이지 (댓글 포함)
+#   /api/questions?...&comments_after=<댓글 id> → 이미 받은 질문에 새로 달린 댓글
+@app.route("/api/questions")
+@login_required(api=True)
+def api_questions():
+    after = request.args.get("after", 0, type=int)
+    questions, next_after = question_page(after)
+    grouped = comments_by_question()
+
+    items = []
+    for q in questions:
+        comments = grouped.get(q["id"], [])
+        items.append(dict(q, comments=comments, html=render_template("_question.html", q=q, comments=comments)))
+
+    result = {"questions": items, "next_after": next_after}
+    comments_after = request.args.get("comments_after", type=int)
+    if comments_after is not None:
+        result["comments"] = [c for c in storage.rows_after(store, "comments", comments_after) if c["question_id"] <= after]
+    return jsonify(result)
+
+
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -130,13 +607,12 @@ def login():
             flash("이메일을 입력하세요.", "danger")
             return redirect(url_for("login"))
 
-        allowed = []
-        if os.path.exists(ALLOWED_EMAILS):
-            with open(ALLOWED_EMAILS, "r", encoding="utf-8") as f:
-                allowed = [e.strip() for e in f.readlines() if e.strip()]
-
-        if email in allowed:
+        role = allow_list.role(email)
+        if role:
+            session.clear()
+            session.regenerate()   # 로그인할 때마다 새 세션 ID
             session["email"] = email
+            session["role"] = role   # 이후 요청은 허용 목록 대신 세션의 역할로 확인
             session.permanent = True
             flash("로그인 성공!", "success")
             return redirect(url_for("home"))
@@ -146,35 +622,23 @@ def login():
 
 
 @app.route("/home")
+@login_required
 def home():
-    email = session.get("email")
-    if not email:
-        flash("로그인이 필요합니다.", "warning")
-        return redirect(url_for("login"))
-    return render_template("home.html", email=email)
+    return render_template("home.html", email=session["email"])
 
 
 @app.route("/logout")
 def logout():
     session.clear()
+    session.regenerate()   # 안내 메시지만 담긴 새 세션 (이전 세션 행은 삭제)
     flash("로그아웃되었습니다.", "info")
     return redirect(url_for("login"))
 
 
 # ───────────── 교수용 업로드 ─────────────
 @app.route("/upload_lecture", methods=["GET", "POST"])
+@professor_required
 def upload_lecture():
-    # ✅ 로그인 및 교수 계정 확인
-    email = session.get("email")
-    if not email:
-        flash("🔒 로그인 후 이용 가능합니다.", "warning")
-        return redirect(url_for("login"))
-    if email != get_professor_email():
-        flash("⚠️ 교수 전용 페이지입니다.", "danger")
-        return redirect(url_for("lecture"))
-
-    df = load_csv(DATA_UPLOADS, ["title", "content", "files", "links", "date", "confirmed"]).fillna('')
-
     if request.method == "POST":
         try:
             title = request.form.get("title", "").strip()
@@ -186,15 +650,9 @@ def upload_lecture():
             link_values = [v.strip() for k, v in request.form.items() if "link" in k and v.strip()]
             links = ";".join(link_values)
 
-            # 📂 파일
-            file_names = []
-            if "files" in request.files:
-                for f in request.files.getlist("files"):
-                    if f and f.filename:
-                        fname = f.filename.replace(" ", "_").replace("/", "").replace("\\", "")
-                        f.save(os.path.join(UPLOAD_FOLDER, secure_filename(fname)))
-
-                        file_names.append(fname)
+            # 📂 파일 (일반 업로드 + 청크 업로드 완료분)
+            file_names = save_uploaded_files(request.files.getlist("files"))
+            file_names += chunked_file_names(request.form.get("chunked_files"))
             files_str = ";".join(file_names)
 
             new_row = {
@@ -206,104 +664,223 @@ def upload_lecture():
                 "confirmed": confirmed,
             }
 
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            save_csv(DATA_UPLOADS, df)
+            store.insert("uploads", new_row)
             flash("자료가 성공적으로 업로드되었습니다.", "success")
 
-        except Exception as e:
-            print(f"[UPLOAD ERROR] {e}")
+        except filestore.UploadTooLarge as e:
+            flash(f"파일이 너무 큽니다 ({e}).", "danger")
+        except Exception:
+            log.exception("업로드 실패")
             flash("업로드 중 오류가 발생했습니다.", "danger")
 
         return redirect(url_for("upload_lecture"))
 
     # ✅ 게시된 자료 목록도 함께 로드
-    df_posts = load_csv(DATA_POSTS, ["title", "content", "files", "links", "date", "confirmed"])
-    return render_template("upload_lecture.html", lectures=df.to_dict("records"), post_titles=df_posts["title"].tolist())
+    post_titles = [p["title"] for p in store.rows("posts")]
+    return render_template(
+        "upload_lecture.html",
+        lectures=store.rows("uploads"),
+        post_titles=post_titles,
+        chunk_threshold=UPLOAD_CHUNK_BYTES,
+    )
 
 
 # ───────────── 강의자료 수정 ─────────────
 @app.route("/edit_lecture/<int:index>", methods=["POST"])
+@professor_required
 def edit_lecture(index):
-    df = load_csv(DATA_UPLOADS, ["title", "content", "files", "links", "date", "confirmed"])
-    if 0 <= index < len(df):
-        lec = df.loc[index].copy()
+    lec = store.get("uploads", index)
+    if lec:
         title = request.form.get("title", lec["title"])
         content = request.form.get("content", lec["content"])
         links = request.form.get("links", lec["links"])
 
+        removed = []
+
         # 🔹 전체 파일 삭제
         if request.form.get("delete_file") == "1" and lec.get("files"):
-            for f in str(lec["files"]).split(";"):
-                path = os.path.join(UPLOAD_FOLDER, f)
-                if os.path.exists(path):
-                    os.remove(path)
+            removed += split_files(lec["files"])
             lec["files"] = ""
 
-        # 🔹 일부 파일 삭제
-        delete_list = request.form.get("delete_files", "")
+        # 🔹 일부 파일 삭제 (실제 파일은 다른 자료가 참조하지 않을 때만 지워짐)
+        delete_list = split_files(request.form.get("delete_files", ""))
         if delete_list:
-            for fname in delete_list.split(";"):
-                path = os.path.join(UPLOAD_FOLDER, fname.strip())
-                if os.path.exists(path):
-                    os.remove(path)
-            remaining = [f for f in str(lec["files"]).split(";") if f.strip() and f.strip() not in delete_list.split(";")]
-            lec["files"] = ";".join(remaining)
+            removed += delete_list
+            lec["files"] = ";".join(f for f in split_files(lec["files"]) if f not in delete_list)
 
         # 🔹 새 파일 추가 (복수 가능, 한글 유지)
-        if "new_files" in request.files:
-            new_files = request.files.getlist("new_files")
-            added = []
-            for nf in new_files:
-                if nf and nf.filename:
-                    fname = nf.filename.replace(" ", "_").replace("/", "").replace("\\", "")
-                    nf.save(os.path.join(UPLOAD_FOLDER, fname))
-                    added.append(fname)
-            if added:
-                combined = str(lec["files"]).split(";") + added
-                lec["files"] = ";".join(f for f in combined if f.strip())
-
-        # 🔹 데이터 반영
-        df.loc[index, ["title", "content", "links", "files"]] = [str(title), str(content), str(links), lec["files"]]
-        df.at[index, "confirmed"] = "pending"   # ✅ 수정 시 상태를 게시 대기로 전환
-
-        save_csv(DATA_UPLOADS, df)
+        try:
+            added = save_uploaded_files(request.files.getlist("new_files"))
+        except filestore.UploadTooLarge as e:
+            flash(f"파일이 너무 큽니다 ({e}).", "danger")
+            return redirect(url_for("upload_lecture"))
+        added += chunked_file_names(request.form.get("chunked_files"))
+        if added:
+            combined = str(lec["files"]).split(";") + added
+            lec["files"] = ";".join(f for f in combined if f.strip())
+
+        # 🔹 데이터 반영 (✅ 수정 시 상태를 게시 대기로 전환)
+        store.update("uploads", index, {
+            "title": title,
+            "content": content,
+            "links": links,
+            "files": lec["files"],
+            "confirmed": "pending",
+        })
+        release_files(removed)
         flash("📘 강의자료가 수정되었습니다.", "success")
-        print(f"[EDIT] '{title}' 수정 완료 / 파일: {lec['files']}")
+        log.info("강의자료 수정", extra={"upload_id": index, "title": title, "files": lec["files"]})
+    return redirect(url_for("upload_lecture"))
+
+
+# ───────────── 대용량 자료 청크 업로드 (이어받기) ─────────────
+#   POST /upload_chunks            {"filename", "size"} → {"upload_id", "chunk_size"}
+#   GET  /upload_chunks/<id>       → 지금까지 받은 크기 (중단 후 이어서 보낼 위치)
+#   PUT  /upload_chunks/<id>       본문=청크, 헤더 X-Upload-Offset → 마지막 청크면 파일 확정
+@app.route("/upload_chunks", methods=["POST"])
+@professor_required(api=True)
+def start_chunked_upload():
+    data = request.get_json(silent=True) or {}
+    try:
+        upload_id = chunked_uploads.start(data.get("filename", ""), int(data.get("size", 0)))
+    except (filestore.UploadError, filestore.UploadTooLarge, ValueError) as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(upload_id=upload_id, chunk_size=UPLOAD_CHUNK_BYTES)
+
+
+@app.route("/upload_chunks/<upload_id>", methods=["GET", "PUT"])
+@professor_required(api=True)
+def chunked_upload(upload_id):
+    try:
+        if request.method == "GET":
+            return jsonify(chunked_uploads.status(upload_id))
+        if (request.content_length or 0) > UPLOAD_CHUNK_BYTES:
+            return jsonify(error="청크가 너무 큽니다"), 413
+        offset = int(request.headers.get("X-Upload-Offset", 0))
+        info = chunked_uploads.write(upload_id, offset, request.stream)
+        if info["received"] < info["size"]:
+            return jsonify(info)
+        name, size, sha256 = chunked_uploads.finish(upload_id, blobs)
+        name = register_file(name, sha256, size)
+        log.info("파일 업로드 (청크)", extra={"file": name, "size": size, "sha256": sha256})
+        file_previews.submit(sha256, name)
+        return jsonify(done=True, name=name, size=size, sha256=sha256)
+    except (filestore.UploadError, ValueError) as e:
+        return jsonify(error=str(e)), 409
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    limit = f"최대 {MAX_REQUEST_BYTES // (1024 * 1024)}MB"
+    if request.path.startswith(("/upload_chunks", "/api/")):
+        return jsonify(error=f"요청이 너무 큽니다 ({limit})"), 413
+    flash(f"요청이 너무 큽니다 ({limit}). 큰 파일은 나눠서 업로드됩니다.", "danger")
     return redirect(url_for("upload_lecture"))
 
 
+def send_blob(sha256, filename):
+    """해시 저장소 파일 전송 — ETag는 내용 해시(강한 검증자), Range/조건부 요청 지원"""
+    path = blobs.path(sha256)
+    if DOWNLOAD_OFFLOAD == "x-accel":
+        # 실제 전송은 nginx가 담당, 워커는 헤더만 만들고 바로 반환
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        resp = send_file(io.BytesIO(), download_name=filename, etag=False, conditional=False)
+        resp.headers["X-Accel-Redirect"] = f"{X_ACCEL_PREFIX}/{sha256[:2]}/{sha256}"
+        resp.set_etag(sha256)
+        resp.last_modified = datetime.fromtimestamp(os.path.getmtime(path))
+        resp.headers.pop("Content-Length", None)
+        resp = resp.make_conditional(request)
+    else:
+        resp = send_file(path, download_name=filename, etag=sha256, conditional=True)
+    resp.headers["Cache-Control"] = DOWNLOAD_CACHE_CONTROL
+    count_file_response(resp, offloaded=DOWNLOAD_OFFLOAD == "x-accel", size=os.path.getsize(path))
+    return resp
+
+
+def count_file_response(resp, offloaded=False, size=0):
+    """전송 바이트 집계 — 304는 0, Range(206)는 부분 길이, nginx 위임 시에는 파일 크기(추정)"""
+    sent = 0
+    if resp.status_code == 200:
+        sent = size if offloaded else (resp.content_length or 0)
+    elif resp.status_code == 206:
+        sent = resp.content_length or 0
+    via = "offload" if offloaded or DOWNLOAD_OFFLOAD == "x-sendfile" else "worker"
+    metrics.registry.inc("hwat25_file_requests_total", status=str(resp.status_code))
+    metrics.registry.inc("hwat25_file_bytes_served_total", sent, via=via)
+
+
 @app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
+    entry = store.find("files", name=filename)
     try:
-        return send_from_directory(UPLOAD_FOLDER, filename)
+        if entry:
+            return send_blob(entry[0]["sha256"], filename)
+        # 숨김 폴더(.blobs, .partial, .previews)와 '..' 경로는 어느 단계에 있어도 거부
+        if any(part.startswith(".") for part in filename.replace("\\", "/").split("/")):
+            raise FileNotFoundError(filename)
+        resp = send_from_directory(UPLOAD_FOLDER, filename)   # 해시 저장소 이전 전 파일
+        resp.headers["Cache-Control"] = DOWNLOAD_CACHE_CONTROL
+        count_file_response(resp)
+        return resp
     except FileNotFoundError:
         flash("파일을 찾을 수 없습니다.", "danger")
         return redirect(url_for("lecture"))
 
 
-# ✅ 게시 확정
-@app.route("/confirm_lecture/<int:index>", methods=["POST"])
-def confirm_lecture(index):
-    df_uploads = load_csv(DATA_UPLOADS, ["title", "content", "files", "links", "date", "confirmed"])
-    df_posts = load_csv(DATA_POSTS, ["title", "content", "files", "links", "date", "confirmed"])
-
-    if 0 <= index < len(df_uploads):
-        row = df_uploads.iloc[index]
-        title = str(row["title"]).strip()
-        date = str(row["date"]).strip()
-
-        # ✅ 게시 또는 재게시 (dtype 일관성 유지)
-        df_uploads.at[index, "confirmed"] = str("yes")
+# 🖼️ 미리보기 썸네일 (내용 해시 주소 → 내용이 바뀌지 않으므로 오래 캐시)
+@app.route("/previews/<sha256>")
+@login_required
+def preview_image(sha256):
+    path = file_previews.thumb_path(sha256) if sha256.isalnum() else None
+    if not path:
+        return "", 404
+    resp = send_file(path, etag=sha256, conditional=True)
+    resp.headers["Cache-Control"] = PREVIEW_CACHE_CONTROL
+    return resp
+
+
+# ✅ 게시 확정 / 게시 취소 (단건 라우트와 일괄 작업이 함께 사용)
+#   저장소 쓰기만 하고, 더 이상 참조되지 않을 수 있는 파일명을 돌려준다 → 호출한 쪽이 쓰기를 마친 뒤 release_files
+def publish_upload(index):
+    """업로드 자료 → 게시자료 (이미 게시된 적 있으면 갱신). 없는 자료면 None"""
+    row = store.get("uploads", index)
+    if not row:
+        return None
+    post = dict(row, confirmed="yes", upload_id=index)
+    post.pop("id")
+    linked = store.find("posts", upload_id=index)   # 게시자료 ↔ 업로드 자료 1:1 연결 (인덱스 조회)
+    dropped = []
+    if linked:
+        # ✅ 재게시: 수정된 내용으로 기존 게시자료 갱신 (중복 게시 방지)
+        store.update("posts", linked[0]["id"], post)
+        dropped = list(set(split_files(linked[0]["files"])) - set(split_files(row["files"])))
+    else:
+        store.insert("posts", post)
+    store.update("uploads", index, {"confirmed": "yes"})
+    log.info("게시 완료", extra={"upload_id": index, "title": row["title"], "republish": bool(linked)})
+    return dropped
+
+
+def unpublish_post(index):
+    """게시자료 삭제 + 연결된 업로드 자료를 게시 전 상태로 (재게시 가능). 없는 자료면 None"""
+    row = store.get("posts", index)
+    if not row or not store.delete("posts", index):
+        return None
+    if row["upload_id"] and store.update("uploads", row["upload_id"], {"confirmed": "no"}):
+        log.info("게시자료 삭제 → 업로드 상태 복귀", extra={"post_id": index, "upload_id": row["upload_id"]})
+    else:
+        log.warning("연결된 업로드 자료 없음", extra={"post_id": index, "title": row["title"]})
+    return split_files(row["files"])
 
-        # 중복 게시 방지
-        if not ((df_posts["title"] == title) & (df_posts["date"] == date)).any():
-            df_posts = pd.concat([df_posts, pd.DataFrame([row])], ignore_index=True)
-            save_csv(DATA_POSTS, df_posts)
 
-        save_csv(DATA_UPLOADS, df_uploads)
+@app.route("/confirm_lecture/<int:index>", methods=["POST"])
+@professor_required
+def confirm_lecture(index):
+    dropped = publish_upload(index)
+    if dropped is not None:
+        release_files(dropped)
         flash("📢 학습사이트에 게시되었습니다.", "success")
-        print(f"[CONFIRM] '{title}' → 게시 완료 (업로드 목록 반영)")
-
     return redirect(url_for("upload_lecture"))
 
 
@@ -313,61 +890,226 @@ def confirm_lecture(index):
 
 # 🗑️ 강의자료 삭제
 @app.route("/delete_lecture/<int:index>", methods=["POST"])
+@professor_required
 def delete_lecture(index):
-    df = load_csv(DATA_UPLOADS, ["title", "content", "files", "links", "date", "confirmed"])
-    if 0 <= index < len(df):
-        df = df.drop(index=index).reset_index(drop=True)
-        save_csv(DATA_UPLOADS, df)
+    row = store.get("uploads", index)
+    if not row:
+        return redirect(url_for("upload_lecture"))
+    with store.batch():
+        deleted = store.delete("uploads", index)
+        # 남겨 둔 게시자료는 연결만 끊는다 (지워진 업로드 id를 가리키지 않도록)
+        for post in store.find("posts", upload_id=index):
+            store.update("posts", post["id"], {"upload_id": None})
+    if deleted:
+        release_files(split_files(row["files"]))
         flash("업로드 자료가 삭제되었습니다 (게시자료는 유지).", "info")
     return redirect(url_for("upload_lecture"))
 
 
 # 🗑️ 학습사이트 게시자료 삭제(교수만)
 @app.route("/delete_confirmed/<int:index>", methods=["POST"])
+@professor_required
 def delete_confirmed(index):
-    email = session.get("email", "")
-    if email != get_professor_email():
-        flash("교수만 삭제할 수 있습니다.", "danger")
-        return redirect(url_for("lecture"))
-
-    df_posts = load_csv(DATA_POSTS, ["title", "content", "files", "links", "date", "confirmed"])
-    df_uploads = load_csv(DATA_UPLOADS, ["title", "content", "files", "links", "date", "confirmed"])
+    files = unpublish_post(index)
+    if files is not None:
+        release_files(files)
+        flash("게시된 자료가 삭제되었습니다.", "info")
+    return redirect(url_for("lecture"))
 
-    if 0 <= index < len(df_posts):
-        row = df_posts.iloc[index]
-        title = str(row.get("title", "")).strip()
-        content = str(row.get("content", "")).strip()
 
-        # 게시자료 삭제
-        df_posts = df_posts.drop(index=index).reset_index(drop=True)
-        save_csv(DATA_POSTS, df_posts)
-        flash("게시된 자료가 삭제되었습니다.", "info")
+# ───────────── 일괄 가져오기 / 게시 / 내보내기 ─────────────
+#   저장소 쓰기는 store.batch() 하나로 묶는다 — SQLite는 트랜잭션 1회, CSV는 바뀐 파일마다 저장 1회.
+#   중간에 실패하면 아무 행도 바뀌지 않고, 먼저 저장된 파일(blob)은 gc-files 가 정리한다.
+def publish_uploads(upload_ids):
+    """여러 업로드 자료를 한 번에 게시. 게시한 id 목록 반환"""
+    done, released = [], []
+    with store.batch():
+        for index in upload_ids:
+            dropped = publish_upload(index)
+            if dropped is not None:
+                done.append(index)
+                released += dropped
+    release_files(released)
+    return done
+
+
+def unpublish_uploads(upload_ids):
+    """여러 업로드 자료의 게시를 한 번에 취소 (게시자료 삭제, 업로드 자료는 게시 전 상태로). 취소한 업로드 id 목록"""
+    done, released = [], []
+    with store.batch():
+        for index in upload_ids:
+            for post in store.find("posts", upload_id=index):
+                files = unpublish_post(post["id"])
+                if files is not None:
+                    done.append(index)
+                    released += files
+    release_files(released)
+    return done
+
+
+def import_bundle(bundle, publish=False):
+    """묶음의 항목을 업로드 자료로 한꺼번에 등록 (publish=True 또는 항목의 publish 면 바로 게시). 새 업로드 id 목록
+
+    파일은 저장소 쓰기 전에 해시 저장소로 스트리밍 저장하고(같은 파일은 한 번만), 행 쓰기는 batch 하나로 한다.
+    """
+    stored = {}   # 묶음 안 경로 → (파일명, 크기, sha256)
+    for item in bundle.items:
+        for path in item["files"]:
+            if path not in stored:
+                with bundle.open(path) as src:
+                    size, sha256 = filestore.save_stream(src, blobs, MAX_FILE_BYTES)
+                stored[path] = (filestore.safe_name(os.path.basename(path)), size, sha256)
+    date = datetime.now().strftime("%Y-%m-%d")
+    ids, released = [], []
+    with store.batch():
+        names = {path: register_file(name, sha256, size) for path, (name, size, sha256) in stored.items()}
+        for item in bundle.items:
+            index = store.insert("uploads", {
+                "title": item["title"],
+                "content": item["content"],
+                "files": ";".join(names[p] for p in item["files"]),
+                "links": ";".join(item["links"]),
+                "date": date,
+                "confirmed": "no",
+            })
+            ids.append(index)
+            if publish or item["publish"]:
+                released += publish_upload(index)
+    release_files(released)
+    for path, (_, _, sha256) in stored.items():
+        file_previews.submit(sha256, names[path])
+    log.info("자료 일괄 가져오기", extra={"items": len(ids), "files": len(stored), "publish": publish})
+    return ids
+
+
+def export_archive(out, include_files=True):
+    """저장소 전체(+ 업로드 파일) → zip. 내보낸 파일 수 반환 (해시 저장소에 없는 파일은 건너뜀)"""
+    tables = {table: (storage.columns(table), store.rows(table)) for table in CSV_PATHS}
+    files = []
+    if include_files:
+        for e in store.rows("files"):
+            if blobs.exists(e["sha256"]):
+                files.append((e["name"], blobs.path(e["sha256"])))
+            else:
+                log.warning("내보내기: 실제 파일 없음", extra={"file": e["name"]})
+    exported = {name for name, _ in files}
+    items = [
+        {
+            "title": up["title"],
+            "content": up["content"],
+            "links": split_files(up["links"]),
+            "files": [f"files/{n}" for n in split_files(up["files"]) if n in exported],
+        }
+        for up in store.rows("uploads")
+    ]
+    return bundles.write_archive(out, tables, files, items)
+
+
+def restore_archive(bundle):
+    """내보낸 zip으로 저장소 전체를 교체 (백업 복원). 테이블별 행 수 반환"""
+    tables = bundle.tables()
+    if not tables:
+        raise bundles.BundleError("저장소 테이블이 없는 묶음입니다 (export-course 로 만든 zip만 복원 가능)")
+    for e in tables.get("files", []):
+        path = f"files/{e['name']}"
+        if bundle.has(path) and not blobs.exists(e["sha256"]):
+            with bundle.open(path) as src:
+                _, sha256 = filestore.save_stream(src, blobs, MAX_FILE_BYTES)
+            if sha256 != e["sha256"]:
+                raise bundles.BundleError(f"파일 내용 불일치: {e['name']}")
+    with store.batch():
+        for table, rows in tables.items():
+            if table in CSV_PATHS:
+                store.replace_all(table, rows)
+    log.info("저장소 복원", extra={t: len(r) for t, r in tables.items()})
+    return {t: len(r) for t, r in tables.items()}
+
+
+def _bundle_from_request():
+    """업로드된 zip (일반 업로드 또는 청크 업로드로 먼저 올린 파일) → (Bundle, 정리할 파일명)"""
+    f = request.files.get("bundle")
+    if f and f.filename:
+        return bundles.Bundle(f.stream), None
+    names = chunked_file_names(request.form.get("chunked_files"))
+    if not names:
+        raise bundles.BundleError("zip 파일을 선택하세요")
+    return bundles.Bundle(blobs.path(store.find("files", name=names[0])[0]["sha256"])), names[0]
+
+
+@app.route("/import_lecture", methods=["POST"])
+@professor_required
+def import_lecture():
+    uploaded = None
+    try:
+        bundle, uploaded = _bundle_from_request()
+        with bundle:
+            ids = import_bundle(bundle, publish=request.form.get("publish") == "1")
+        flash(f"📦 자료 {len(ids)}건을 가져왔습니다.", "success")
+    except (bundles.BundleError, filestore.UploadTooLarge) as e:
+        flash(f"가져오기 실패: {e}", "danger")
+    finally:
+        if uploaded:
+            release_files([uploaded])   # 묶음 zip 자체는 보관하지 않는다
+    return redirect(url_for("upload_lecture"))
 
-        # ✅ 업로드 목록 상태 변경 → 재게시 표시
-        matched = False
-        for i in range(len(df_uploads)):
-            up_title = str(df_uploads.at[i, "title"]).strip()
-            up_content = str(df_uploads.at[i, "content"]).strip()
 
-            # 제목이 거의 같거나, 내용 일부가 일치하면 동일 자료로 간주
-            if (
-                up_title == title or
-                up_title.replace("(수정)", "").strip() == title or
-                title.replace("(수정)", "").strip() == up_title or
-                (len(content) > 10 and content[:15] in up_content)
-            ):
-                df_uploads.at[i, "confirmed"] = "no"   # ✅ 게시자료 삭제 시 → 게시 확정으로 복귀
+@app.route("/batch_lecture", methods=["POST"])
+@professor_required
+def batch_lecture():
+    ids = request.form.getlist("ids", type=int)
+    if not ids:
+        flash("선택된 자료가 없습니다.", "warning")
+    elif request.form.get("action") == "unpublish":
+        flash(f"자료 {len(unpublish_uploads(ids))}건의 게시를 취소했습니다.", "info")
+    else:
+        flash(f"📢 자료 {len(publish_uploads(ids))}건을 게시했습니다.", "success")
+    return redirect(url_for("upload_lecture"))
 
-                matched = True
-                print(f"[DELETE CONFIRMED] '{up_title}' 삭제됨 → 업로드 목록 상태 갱신 완료")
-                break
 
-        if not matched:
-            print(f"[WARN] 일치 항목 없음 → 제목 '{title}' / 내용 '{content[:20]}'")
+# 📦 일괄 작업 API (교수 전용)
+#   POST /api/import   multipart: bundle=<zip> [publish=1]                  → {"ids": [...]}
+#   POST /api/batch    {"action": "publish"|"unpublish", "upload_ids": [...]} → {"done": [...]}
+#   GET  /api/export   [?files=0]                                          → 저장소 전체 zip
+@app.route("/api/import", methods=["POST"])
+@professor_required(api=True)
+def api_import():
+    uploaded = None
+    try:
+        bundle, uploaded = _bundle_from_request()
+        with bundle:
+            ids = import_bundle(bundle, publish=request.form.get("publish") == "1")
+    except (bundles.BundleError, filestore.UploadTooLarge) as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        if uploaded:
+            release_files([uploaded])
+    return jsonify(ids=ids)
+
+
+@app.route("/api/batch", methods=["POST"])
+@professor_required(api=True)
+def api_batch():
+    data = request.get_json(silent=True) or {}
+    action = data.get("action")
+    if action not in ("publish", "unpublish"):
+        return jsonify(error="action은 publish 또는 unpublish"), 400
+    try:
+        ids = [int(i) for i in data.get("upload_ids") or []]
+    except (TypeError, ValueError):
+        return jsonify(error="upload_ids는 숫자 목록이어야 합니다"), 400
+    done = publish_uploads(ids) if action == "publish" else unpublish_uploads(ids)
+    return jsonify(action=action, done=done, skipped=[i for i in ids if i not in done])
 
-        save_csv(DATA_UPLOADS, df_uploads)
 
-    return redirect(url_for("lecture"))
+@app.route("/api/export")
+@professor_required(api=True)
+def api_export():
+    # 디스크의 임시 파일에 쓴 뒤 전송 (수백 MB 묶음도 메모리에 올리지 않음), 닫히면 자동 삭제
+    tmp = tempfile.TemporaryFile(dir=UPLOAD_STAGING)
+    export_archive(tmp, include_files=request.args.get("files", "1") != "0")
+    tmp.seek(0)
+    name = f"hwat25_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+    return send_file(tmp, mimetype="application/zip", as_attachment=True, download_name=name)
 
 
 
@@ -376,116 +1118,103 @@ def delete_confirmed(index):
 
 # ───────────── Q&A 질문 등록/수정/삭제 ─────────────
 @app.route("/add_question", methods=["POST"])
+@login_required
 def add_question():
-    email = session.get("email", "")
-    if not email:
-        flash("로그인이 필요합니다.", "warning")
-        return redirect(url_for("login"))
-
+    email = session["email"]
     title = request.form.get("title", "").strip()
     content = request.form.get("content", "").strip()
     if not title or not content:
         flash("제목과 내용을 모두 입력해주세요.", "warning")
         return redirect(url_for("lecture"))
 
-    df = load_csv(DATA_QUESTIONS, ["id", "title", "content", "email", "date"])
-    new_id = len(df) + 1
     new_q = {
-        "id": new_id,
         "title": title,
         "content": content,
         "email": email,
         "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
     }
-    df = pd.concat([df, pd.DataFrame([new_q])], ignore_index=True)
-    save_csv(DATA_QUESTIONS, df)
+    store.insert("questions", new_q)
     flash("질문이 등록되었습니다.", "success")
     return redirect(url_for("lecture"))
 
 
 @app.route("/edit_question/<int:q_id>", methods=["POST"])
+@login_required
 def edit_question(q_id):
-    email = session.get("email", "")
-    df = load_csv(DATA_QUESTIONS, ["id", "title", "content", "email", "date"])
-    if 0 <= q_id - 1 < len(df):
-        row = df.iloc[q_id - 1]
-        if row["email"] == email or email == get_professor_email():
+    email = session["email"]
+    row = store.get("questions", q_id)
+    if row:
+        if row["email"] == email or is_professor():
             new_title = request.form.get("edited_title", "").strip()
             new_content = request.form.get("edited_content", "").strip()
+            fields = {"date": datetime.now().strftime("%Y-%m-%d %H:%M")}
             if new_title:
-                df.at[q_id - 1, "title"] = new_title
+                fields["title"] = new_title
             if new_content:
-                df.at[q_id - 1, "content"] = new_content
-            df.at[q_id - 1, "date"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-            save_csv(DATA_QUESTIONS, df)
+                fields["content"] = new_content
+            store.update("questions", q_id, fields)
             flash("질문이 수정되었습니다.", "info")
     return redirect(url_for("lecture"))
 
 
 @app.route("/delete_question/<int:q_id>", methods=["POST"])
+@login_required
 def delete_question(q_id):
-    email = session.get("email", "")
-    df = load_csv(DATA_QUESTIONS, ["id", "title", "content", "email", "date"])
-    if 0 <= q_id - 1 < len(df):
-        row = df.iloc[q_id - 1]
-        if row["email"] == email or email == get_professor_email():
-            df = df.drop(index=q_id - 1).reset_index(drop=True)
-            save_csv(DATA_QUESTIONS, df)
+    email = session["email"]
+    row = store.get("questions", q_id)
+    if row:
+        if row["email"] == email or is_professor():
+            store.delete("questions", q_id)
             flash("질문이 삭제되었습니다.", "info")
     return redirect(url_for("lecture"))
 
 
 # ───────────── Q&A 댓글 등록/수정/삭제 ─────────────
 @app.route("/add_comment/<int:q_id>", methods=["POST"])
+@login_required
 def add_comment(q_id):
-    email = session.get("email", "")
-    if not email:
-        flash("로그인이 필요합니다.", "warning")
-        return redirect(url_for("login"))
-
+    email = session["email"]
     comment = request.form.get("comment", "").strip()
     if not comment:
         flash("댓글 내용을 입력해주세요.", "warning")
         return redirect(url_for("lecture"))
 
-    df = load_csv(DATA_COMMENTS, ["question_id", "comment", "email", "date"])
     new_row = {
         "question_id": q_id,
         "comment": comment,
         "email": email,
         "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
     }
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    save_csv(DATA_COMMENTS, df)
+    store.insert("comments", new_row)
     flash("댓글이 등록되었습니다.", "success")
     return redirect(url_for("lecture"))
 
 
-@app.route("/edit_comment/<int:q_id>/<int:c_idx>", methods=["POST"])
-def edit_comment(q_id, c_idx):
-    email = session.get("email", "")
-    df = load_csv(DATA_COMMENTS, ["question_id", "comment", "email", "date"])
-    if 0 <= c_idx < len(df):
-        row = df.iloc[c_idx]
-        if row["email"] == email or email == get_professor_email():
+@app.route("/edit_comment/<int:q_id>/<int:c_id>", methods=["POST"])
+@login_required
+def edit_comment(q_id, c_id):
+    email = session["email"]
+    row = store.get("comments", c_id)
+    if row and row["question_id"] == q_id:
+        if row["email"] == email or is_professor():
             new_comment = request.form.get("edited_comment", "").strip()
             if new_comment:
-                df.at[c_idx, "comment"] = new_comment
-                df.at[c_idx, "date"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-                save_csv(DATA_COMMENTS, df)
+                store.update("comments", c_id, {
+                    "comment": new_comment,
+                    "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                })
                 flash("댓글이 수정되었습니다.", "info")
     return redirect(url_for("lecture"))
 
 
-@app.route("/delete_comment/<int:q_id>/<int:c_idx>", methods=["POST"])
-def delete_comment(q_id, c_idx):
-    email = session.get("email", "")
-    df = load_csv(DATA_COMMENTS, ["question_id", "comment", "email", "date"])
-    if 0 <= c_idx < len(df):
-        row = df.iloc[c_idx]
-        if row["email"] == email or email == get_professor_email():
-            df = df.drop(index=c_idx).reset_index(drop=True)
-            save_csv(DATA_COMMENTS, df)
+@app.route("/delete_comment/<int:q_id>/<int:c_id>", methods=["POST"])
+@login_required
+def delete_comment(q_id, c_id):
+    email = session["email"]
+    row = store.get("comments", c_id)
+    if row and row["question_id"] == q_id:
+        if row["email"] == email or is_professor():
+            store.delete("comments", c_id)
             flash("댓글이 삭제되었습니다.", "info")
     return redirect(url_for("lecture"))
 
@@ -493,37 +1222,309 @@ def delete_comment(q_id, c_idx):
 
 # ───────────── 데이터 확인용 (교수 전용) ─────────────
 @app.route("/check_data")
+@professor_required
 def check_data():
-    email = session.get("email")
+    # ✅ 업로드 파일 목록은 manifest에서 (파일 시스템을 훑지 않음), 정렬/필터/페이지
+    manifest = file_manifest()
+    q = request.args.get("q", "").strip().lower()
+    show = request.args.get("show", "all")
+    sort = request.args.get("sort", "name")
+    desc = request.args.get("order", "asc") == "desc"
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    entries = manifest["entries"]
+    if q:
+        entries = [e for e in entries if q in e["name"].lower() or e["sha256"].startswith(q)]
+    if show == "orphan":
+        entries = [e for e in entries if e["orphan"]]
+    elif show == "missing":
+        entries = [e for e in entries if e["missing"]]
+    sort_keys = {
+        "name": lambda e: e["name"],
+        "size": lambda e: e["size"] or 0,
+        "mtime": lambda e: e["mtime"] or e["date"],
+        "refs": lambda e: e["refs"],
+    }
+    entries = sorted(entries, key=sort_keys.get(sort, sort_keys["name"]), reverse=desc)
+    total = len(entries)
+    entries = entries[(page - 1) * MANIFEST_PAGE_SIZE: page * MANIFEST_PAGE_SIZE]
+
+    # ✅ 저장소 파일 (DB 또는 CSV) — 개수가 정해져 있어 바로 확인
+    data_paths = [DB_PATH, DB_PATH + "-wal"] if store.backend == "sqlite" else list(CSV_PATHS.values())
+    data_files = []
+    for path in data_paths:
+        if os.path.exists(path):
+            data_files.append({
+                "name": path,
+                "size": round(os.path.getsize(path) / 1024, 2),
+                "mtime": datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+
+    return render_template(
+        "check_data.html",
+        files=entries,
+        data_files=data_files,
+        manifest=manifest,
+        total=total,
+        page=page,
+        pages=max((total + MANIFEST_PAGE_SIZE - 1) // MANIFEST_PAGE_SIZE, 1),
+        q=q,
+        show=show,
+        sort=sort,
+        order="desc" if desc else "asc",
+    )
 
-    # ✅ 로그인 여부 확인
-    if not email:
-        flash("🔒 로그인 후 이용 가능합니다.", "warning")
-        return redirect(url_for("login"))
 
-    # ✅ 교수 전용 접근 제한
-    if email != get_professor_email():
-        flash("🚫 접근 권한이 없습니다. 교수님 계정으로 로그인하세요.", "danger")
-        return redirect(url_for("home"))
+# ✅ 허용 목록 즉시 다시 읽기 (교수 전용) — 파일 mtime을 갱신해 다른 워커도 다시 읽게 함
+@app.route("/reload_allowlist", methods=["POST"])
+@professor_required(api=True)
+def reload_allowlist():
+    if os.path.exists(ALLOWED_EMAILS):
+        os.utime(ALLOWED_EMAILS)
+    allow_list.reload()
+    return jsonify(count=len(allow_list.roles), professor=allow_list.professor)
 
-    # ✅ 데이터 디렉터리 탐색
-    data_dir = "/data"
-    file_info = []
 
-    for root, _, files in os.walk(data_dir):
-        for f in files:
-            path = os.path.join(root, f)
-            try:
-                size_kb = round(os.path.getsize(path) / 1024, 2)
-                mtime = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
-                rel_path = os.path.relpath(path, data_dir)
-                file_info.append({"name": rel_path, "size": size_kb, "mtime": mtime})
-            except:
+# ✅ 읽기 캐시 적중률 확인 (교수 전용, 워커별 값)
+@app.route("/cache_stats")
+@professor_required(api=True)
+def cache_stats():
+    return jsonify(pid=os.getpid(), backend=store.backend, **store.cache.stats())
+
+
+def metric_gauges():
+    cache = store.cache.stats()
+    return {
+        "hwat25_read_cache_hits_total": cache["hits"],
+        "hwat25_read_cache_misses_total": cache["misses"],
+        "hwat25_read_cache_bytes": cache["bytes"],
+    }
+
+
+# ✅ 요청/저장소/렌더링 시간 (교수 전용, 워커별 값 — 새로고침하면 다른 워커 값일 수 있음)
+@app.route("/check_metrics")
+@professor_required
+def check_metrics():
+    hists, counters = metrics.registry.snapshot()
+    return render_template(
+        "check_metrics.html",
+        hists=hists,
+        counters=counters,
+        gauges=metric_gauges(),
+        pid=os.getpid(),
+        uptime=int(time.time() - metrics.registry.started),
+    )
+
+
+# ✅ Prometheus 수집용 — 교수 로그인 또는 Authorization: Bearer <METRICS_TOKEN>
+@app.route("/metrics")
+def prometheus_metrics():
+    token = os.environ.get("METRICS_TOKEN")
+    authorized = is_professor() or (
+        token and request.headers.get("Authorization") == f"Bearer {token}"
+    )
+    if not authorized:
+        return "forbidden\n", 403, {"Content-Type": "text/plain"}
+    return metrics.registry.prometheus(metric_gauges()), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+
+# ───────────── 데이터 가져오기/내보내기 (CLI) ─────────────
+@app.cli.command("export-csv")
+@click.argument("out_dir", default=".")
+def export_csv_command(out_dir):
+    """저장소 전체를 CSV 파일로 내보내기 (기존 CSV 파일명 유지)"""
+    for table, path in CSV_PATHS.items():
+        dest = os.path.join(out_dir, os.path.basename(path))
+        n = storage.export_csv(store, table, dest)
+        click.echo(f"{table}: {n}행 → {dest}")
+
+
+@app.cli.command("import-csv")
+@click.argument("src_dir", default=".")
+def import_csv_command(src_dir):
+    """CSV 파일에서 저장소로 가져오기 (테이블 내용을 교체)"""
+    for table, path in CSV_PATHS.items():
+        src = os.path.join(src_dir, os.path.basename(path))
+        if os.path.exists(src):
+            n = storage.import_csv(store, table, src)
+            click.echo(f"{table}: {n}행 ← {src}")
+
+
+@app.cli.command("export-course")
+@click.argument("out", default=None, required=False)
+@click.option("--no-files", is_flag=True, help="업로드 파일 없이 저장소 데이터만")
+def export_course_command(out, no_files):
+    """저장소 전체 + 업로드 파일을 zip 하나로 (백업 / 다음 학기로 옮기기)"""
+    out = out or f"hwat25_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+    n = export_archive(out, include_files=not no_files)
+    click.echo(f"{out}: 파일 {n}개 ({os.path.getsize(out) / 1024 / 1024:.1f}MB)")
+
+
+@app.cli.command("import-course")
+@click.argument("source")
+@click.option("--publish", is_flag=True, help="가져온 자료를 바로 게시")
+@click.option("--restore", is_flag=True, help="export-course 로 만든 zip으로 저장소 전체를 교체 (백업 복원)")
+def import_course_command(source, publish, restore):
+    """zip / 폴더 / manifest.json·csv 의 자료를 업로드 자료로 한꺼번에 등록"""
+    try:
+        with bundles.Bundle(source) as bundle:
+            if restore:
+                for table, n in restore_archive(bundle).items():
+                    click.echo(f"{table}: {n}행 복원")
+                return
+            ids = import_bundle(bundle, publish=publish)
+    except (bundles.BundleError, filestore.UploadTooLarge) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"자료 {len(ids)}건 등록 (id {ids[0]}–{ids[-1]})" if ids else "가져올 항목이 없습니다")
+
+
+@app.cli.command("publish-uploads")
+@click.argument("ids", nargs=-1, type=int)
+@click.option("--pending", is_flag=True, help="아직 게시하지 않은(또는 수정된) 자료 전체")
+@click.option("--undo", is_flag=True, help="게시 취소")
+def publish_uploads_command(ids, pending, undo):
+    """업로드 자료 여러 건을 한 번에 게시 (또는 --undo 로 게시 취소)"""
+    ids = list(ids)
+    if pending:
+        ids += [u["id"] for u in store.rows("uploads") if u["confirmed"] != "yes"]
+    if not ids:
+        raise click.UsageError("ID 또는 --pending 을 지정하세요")
+    done = unpublish_uploads(ids) if undo else publish_uploads(ids)
+    click.echo(f"{'게시 취소' if undo else '게시'} {len(done)}건: {done}")
+
+
+@app.cli.command("prune-posts")
+def prune_posts_command():
+    """보관 기간이 지난 게시자료 삭제 (cron 등에서 주기 실행)"""
+    click.echo(f"만료 게시자료 {prune_expired_posts()}건 삭제 (기준일 {post_cutoff()})")
+
+
+@app.cli.command("migrate-files")
+def migrate_files_command():
+    """uploads/, static/uploads/ 의 기존 파일을 해시 저장소로 이전 (uploads/ 원본은 제거, static은 유지)"""
+    sources = [(UPLOAD_FOLDER, True), (os.path.join(app.root_path, "static", "uploads"), False)]
+    for folder, move in sources:
+        if not os.path.isdir(folder):
+            continue
+        for fname in sorted(os.listdir(folder)):
+            path = os.path.join(folder, fname)
+            name = filestore.safe_name(fname)
+            if fname.startswith(".") or not name or not os.path.isfile(path):
                 continue
+            sha256 = filestore.file_sha256(path)
+            if not blobs.exists(sha256):
+                fd, tmp = tempfile.mkstemp(dir=blobs.root, prefix=".migrate-")
+                os.close(fd)
+                shutil.copyfile(path, tmp)
+                blobs.adopt(tmp, sha256)
+            final = register_file(name, sha256, os.path.getsize(path))
+            if move:
+                os.remove(path)
+            note = f" (이름 충돌 → {final})" if final != name else ""
+            click.echo(f"{fname} → {sha256[:12]}{note}")
+
+
+@app.cli.command("gc-files")
+def gc_files_command():
+    """참조가 없는 파일과 중단된 청크 업로드 정리 (최근 1시간 내 등록된 파일은 게시 전일 수 있어 제외)"""
+    recent = (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M")
+    counts = file_refcounts()
+    orphans = [e["name"] for e in store.rows("files") if not counts[e["name"]] and e["date"] < recent]
+    release_files(orphans)
+    known = {e["sha256"] for e in store.rows("files")}
+    stray = 0
+    for sha256, _, _ in list(blobs.scan()):
+        if sha256 not in known:
+            blobs.remove(sha256)
+            stray += 1
+    pruned = file_previews.prune(known)
+    partial = sweep_partial_uploads()
+    click.echo(f"참조 없는 파일명 {len(orphans)}개, 연결 없는 파일 {stray}개, 미리보기 {pruned}개, 중단된 업로드 {partial}개 정리")
+
+
+@app.cli.command("scan-files")
+def scan_files_command():
+    """해시 저장소와 파일 목록 대조 (크기/mtime 보정, 빠진 파일·연결 없는 파일 보고)"""
+    report = rescan_files(force=True)
+    click.echo(f"저장 파일 {report['blobs']}개 ({report['bytes'] / 1024 / 1024:.1f}MB), 보정 {report['fixed']}건")
+    for name in report["missing"]:
+        click.echo(f"⚠️ 실제 파일 없음: {name}")
+    for s in report["stray"]:
+        click.echo(f"⚠️ 목록에 없는 파일: {s['sha256'][:12]} ({s['size']}B) — flask gc-files 로 정리")
+
+
+@app.cli.command("build-previews")
+@click.option("--force", is_flag=True, help="이미 있는 미리보기도 다시 생성")
+def build_previews_command(force):
+    """pdf/pptx 미리보기 생성 (서버는 업로드·조회 때 백그라운드로 만들지만, 배포 직후 한꺼번에 만들 때 사용)"""
+    tools = ", ".join(f"{k}={'있음' if v else '없음'}" for k, v in file_previews.tools.items())
+    click.echo(f"외부 도구: {tools}")
+    seen = set()
+    for e in store.rows("files"):
+        if e["sha256"] in seen or not previews.kind_of(e["name"]):
+            continue
+        seen.add(e["sha256"])
+        meta = file_previews.build(e["sha256"], e["name"], force=force)
+        if meta is None:
+            click.echo(f"⏭️ {e['name']} (원본 없음 또는 다른 워커가 생성 중)")
+            continue
+        note = f" ⚠️ {'; '.join(meta['errors'])}" if meta["errors"] else ""
+        click.echo(f"{e['name']}: {meta['pages'] or '?'}쪽, 썸네일 {'있음' if meta['thumb'] else '없음'}{note}")
+
+
+@app.cli.command("compact-qa")
+def compact_qa_command():
+    """CSV 저장소: Q&A 이벤트 로그를 CSV 스냅샷에 반영하고 보관 로그로 옮긴다"""
+    if not hasattr(store, "compact"):
+        click.echo("SQLite 저장소는 압축이 필요 없습니다 (행 단위로 저장)")
+        return
+    for table in storage.EVENT_TABLES:
+        click.echo(f"{table}: 이벤트 {store.compact(table)}건 반영")
+
+
+@app.cli.command("qa-history")
+@click.argument("limit", default=50)
+@click.option("--table", type=click.Choice(storage.EVENT_TABLES), default=None)
+def qa_history_command(limit, table):
+    """최근 Q&A 변경 이력 (질문/댓글 작성·수정·삭제)"""
+    for e in store.events(table, limit):
+        who = (e["row"] or {}).get("email", "")
+        click.echo(f"{e['ts']}  {e['table']:<9} {e['op']:<6} #{e['id'] or '-'}  {who}")
+
+
+@app.cli.command("sweep-sessions")
+def sweep_sessions_command():
+    """만료된 세션 삭제"""
+    click.echo(f"만료 세션 {session_store.sweep()}개 삭제")
+
+
+@app.cli.command("sessions")
+def sessions_command():
+    """로그인 중인 사용자별 세션 수"""
+    for s in session_store.active():
+        click.echo(f"{s['email']:<30} {s['role']:<10} {s['sessions']}")
+
+
+@app.cli.command("revoke-sessions")
+@click.argument("email", required=False)
+@click.option("--all", "revoke_all", is_flag=True, help="모든 사용자 로그아웃")
+def revoke_sessions_command(email, revoke_all):
+    """특정 이메일(또는 --all 전체)의 세션을 폐기해 즉시 로그아웃"""
+    if not email and not revoke_all:
+        raise click.UsageError("EMAIL 또는 --all 을 지정하세요")
+    click.echo(f"세션 {session_store.revoke(None if revoke_all else email)}개 폐기")
 
-    file_info = sorted(file_info, key=lambda x: x["name"])
-    return render_template("check_data.html", files=file_info)
 
+@app.cli.command("check-startup")
+def check_startup_command():
+    """배포 전 기동 점검 (Render 빌드/로컬 공통)"""
+    problems = startup_check()
+    for p in problems:
+        click.echo(f"⚠️ {p}")
+    click.echo(f"저장소={store.backend}, 업로드={UPLOAD_FOLDER}, 문제 {len(problems)}건")
+    if problems:
+        raise SystemExit(1)
 
 
 # ───────────── Health Check ─────────────
@@ -535,6 +1536,8 @@ def health():
 # ───────────── 앱 실행 ─────────────
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
-    print(f"✅ Server running on port {port}")
-    app.run(host="0.0.0.0", port=port)
+    for problem in startup_check():
+        log.warning(f"기동 점검: {problem}")
+    log.info("서버 시작", extra={"port": port})
+    app.run(host="0.0.0.0", port=port, threaded=True)
 
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+🔐 로그인 허용 목록 (allowed_emails.txt)
+- 첫 번째 이메일 = 교수 (기존 규칙 유지)
+- "이메일,역할" 형식으로 역할 지정 가능 (예: ta@yc.ac.kr,professor), 생략 시 student
+- '#'으로 시작하는 줄은 주석
+파일은 수정 시각(mtime)이 바뀔 때만 다시 읽고, 조회는 set/dict로 O(1).
+역할은 로그인할 때 세션에 저장되므로, 라우트는 login_required / professor_required 로만 확인한다.
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import partial, wraps
+
+from flask import flash, g, jsonify, redirect, session, url_for
+
+log = logging.getLogger("hwat25.auth")
+
+
+class AllowList:
+    """allowed_emails.txt 캐시 (워커 프로세스별)"""
+
+    def __init__(self, path, check_interval=1.0, on_change=None, known=None):
+        self.path = path
+        self.check_interval = check_interval   # mtime 확인 간격(초)
+        self.on_change = on_change             # 다시 읽었을 때 역할이 바뀐 이메일 {email: 새 역할 또는 None}
+        self.known = known                     # 세션이 남아 있는 이메일 목록 — 첫 로드 때 비교 대상
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked = 0.0
+        self.roles = {}          # email → "professor" / "student" / ...
+        self.professor = None    # 첫 번째 이메일
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, stamp):
+        roles, professor = {}, None
+        if stamp is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    email, _, role = (p.strip() for p in line.partition(","))
+                    if professor is None:
+                        professor, role = email, "professor"
+                    roles[email] = role or "student"
+        old, first = self.roles, self._stamp is None and not self.roles
+        self.roles, self.professor, self._stamp = roles, professor, stamp
+        log.info("허용 목록 로드", extra={"count": len(roles), "professor": professor})
+        if first:
+            # 재배포 직후에는 이전 목록을 모르므로, 남아 있는 세션의 이메일을 새 목록으로 모두 다시 확인
+            changes = {e: roles.get(e) for e in (self.known() if self.known else ())}
+        else:
+            changes = {e: roles.get(e) for e in set(old) | set(roles) if old.get(e) != roles.get(e)}
+        if changes and self.on_change:
+            self.on_change(changes)
+
+    def _refresh(self):
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+        with self._lock:
+            # 다른 스레드(세션 정리 작업 등)가 읽는 중이었다면 끝날 때까지 기다렸다가 그 결과를 쓴다
+            if time.monotonic() - self._checked < self.check_interval:
+                return
+            stamp = self._stat()
+            if stamp != self._stamp:
+                self._load(stamp)
+            self._checked = time.monotonic()
+
+    def refresh(self):
+        """파일이 바뀌었으면 다시 읽기 (확인 간격 이내면 바로 반환)"""
+        self._refresh()
+
+    def reload(self):
+        """강제로 다시 읽기"""
+        with self._lock:
+            self._load(self._stat())
+            self._checked = time.monotonic()
+
+    def role(self, email):
+        self._refresh()
+        return self.roles.get(email)
+
+    def is_allowed(self, email):
+        return self.role(email) is not None
+
+    def is_professor(self, email):
+        return email is not None and self.role(email) == "professor"
+
+    def professor_email(self):
+        self._refresh()
+        return self.professor
+
+
+# ───────────── 라우트 접근 제어 ─────────────
+def current_role():
+    """이번 요청 사용자의 역할 — 세션에 저장된 값 (요청당 한 번만 계산)"""
+    if "role" not in g:
+        g.role = session.get("role") if session.get("email") else None
+    return g.role
+
+
+def is_professor():
+    return current_role() == "professor"
+
+
+def login_required(view=None, *, api=False):
+    """로그인하지 않았으면 로그인 페이지로 (api=True 이면 401 JSON)"""
+    if view is None:
+        return partial(login_required, api=api)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_role() is None:
+            if api:
+                return jsonify(error="login required"), 401
+            flash("🔒 로그인 후 이용 가능합니다.", "warning")
+            return redirect(url_for("login"))
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def professor_required(view=None, *, api=False):
+    """교수 계정만 (api=True 이면 403 JSON, 아니면 안내 후 학습 사이트로)"""
+    if view is None:
+        return partial(professor_required, api=api)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        role = current_role()
+        if role != "professor":
+            if api:
+                return jsonify(error="forbidden"), 403
+            if role is None:
+                flash("🔒 로그인 후 이용 가능합니다.", "warning")
+                return redirect(url_for("login"))
+            flash("⚠️ 교수 전용 페이지입니다.", "danger")
+            return redirect(url_for("lecture"))
+        return view(*args, **kwargs)
+    return wrapper
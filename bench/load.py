@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+🏫 수업 시간 동시 접속 부하 테스트 — 학생 50명이 동시에 로그인·자료 열람·댓글·파일 다운로드,
+교수 1명은 그 사이 자료를 업로드한다. 엔드포인트별 p50/p95/p99 지연과 처리량을 JSON으로 남긴다.
+
+    python bench/load.py --mode client                      # Flask test client (프로세스 내부, 스레드)
+    python bench/load.py --mode gunicorn --workers 3        # 실제 gunicorn + 학생별 프로세스
+    python bench/load.py --backend csv --out csv.json       # 현재 CsvStore(이벤트 로그) 백엔드로 측정
+    python bench/load.py --compare csv.json                 # 저장된 결과 대비 p95 변화 출력
+
+load_csv/save_csv 방식(처음 버전) 기준값 — 예전 checkout을 --app-root 로 지정한다:
+    git worktree add /tmp/hwat25-baseline <처음 커밋>
+    python bench/load.py --app-root /tmp/hwat25-baseline --out baseline.json
+    python bench/load.py --compare baseline.json
+
+측정 항목: login, lecture, add_comment, uploaded_file, upload_lecture
+데이터는 seed.py 가 처음 버전의 CSV 형식으로 만들므로 어느 checkout이든 같은 데이터로 측정한다.
+--app-root 에 gunicorn.conf.py 가 없으면 그 시점 배포 명령(gunicorn app:app)에 워커 수·포트만 지정해 실행한다.
+"""
+
+import argparse
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [BENCH_DIR, ROOT]
+
+import seed as seeding   # noqa: E402
+
+ENDPOINTS = ("login", "lecture", "add_comment", "uploaded_file", "upload_lecture")
+
+
+# ───────────── 통계 ─────────────
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples, elapsed):
+    """samples: (엔드포인트, 지연 ms, 성공 여부) 목록"""
+    out = {}
+    for name in ENDPOINTS + ("total",):
+        picked = [s for s in samples if name == "total" or s[0] == name]
+        ms = sorted(s[1] for s in picked)
+        out[name] = {
+            "count": len(picked),
+            "errors": sum(1 for s in picked if not s[2]),
+            "rps": round(len(picked) / elapsed, 2) if elapsed else None,
+            "mean_ms": round(statistics.fmean(ms), 2) if ms else None,
+            **{f"p{p}_ms": round(percentile(ms, p), 2) if ms else None for p in (50, 95, 99)},
+            "max_ms": round(ms[-1], 2) if ms else None,
+        }
+    return out
+
+
+# ───────────── HTTP 세션 (gunicorn 모드) ─────────────
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for key, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class HttpSession:
+    """keep-alive 연결 1개 + 세션 쿠키 직접 관리 (Secure 쿠키도 http로 전달, 리다이렉트는 따라가지 않음)"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+        self.cookie = None
+
+    def request(self, method, path, fields=None, files=None):
+        headers = {}
+        body = None
+        if files:
+            body, headers["Content-Type"] = encode_multipart(fields or {}, files)
+        elif fields is not None:
+            body = urllib.parse.urlencode(fields).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()   # 끊긴 keep-alive 연결은 한 번 다시 연결
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        while resp.read(1024 * 1024):
+            pass
+        set_cookie = resp.getheader("Set-Cookie")
+        if set_cookie and set_cookie.startswith("session="):
+            self.cookie = set_cookie.split(";", 1)[0]
+        return resp.status
+
+
+class ClientSession:
+    """Flask test client 래퍼 (HttpSession과 같은 인터페이스)"""
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, fields=None, files=None):
+        data = dict(fields or {})
+        for key, (filename, blob) in (files or {}).items():
+            data[key] = (io.BytesIO(blob), filename)
+        resp = self.client.open(path, method=method, data=data or None, buffered=True)
+        resp.close()
+        return resp.status_code
+
+
+# ───────────── 시나리오 ─────────────
+def timed(samples, name, fn, expect=(200, 302)):
+    """GET은 200만 성공으로 본다 (로그인이 풀려 /login으로 리다이렉트되면 실패)"""
+    t0 = time.perf_counter()
+    try:
+        ok = fn() in expect
+    except Exception:
+        ok = False
+    samples.append((name, (time.perf_counter() - t0) * 1000, ok))
+
+
+def student(session, email, plan, start_at, duration, rng_seed):
+    """로그인 후 [자료 목록 → 댓글 → 파일 다운로드]를 duration초 동안 반복"""
+    rng = random.Random(rng_seed)
+    samples = []
+    time.sleep(max(0.0, start_at - time.time()))   # 모든 학생이 동시에 시작 (수업 시작 직후 몰림)
+    timed(samples, "login", lambda: session.request("POST", "/login", {"email": email}))
+    deadline = start_at + duration
+    while time.time() < deadline:
+        timed(samples, "lecture", lambda: session.request("GET", "/lecture"), expect=(200,))
+        q_id = rng.randrange(plan["questions"]) + 1
+        timed(samples, "add_comment", lambda: session.request(
+            "POST", f"/add_comment/{q_id}", {"comment": f"부하 테스트 댓글 {rng.random():.6f}"}))
+        name = urllib.parse.quote(rng.choice(plan["files"]))
+        timed(samples, "uploaded_file", lambda: session.request("GET", f"/uploads/{name}"), expect=(200,))
+        time.sleep(rng.uniform(0, plan["think"]))
+    return samples
+
+
+def professor(session, plan, start_at, duration, upload_mb):
+    """교수: 학생들이 몰린 상태에서 upload_mb 크기의 자료를 주기적으로 업로드"""
+    samples = []
+    blob = os.urandom(upload_mb * 1024 * 1024)
+    time.sleep(max(0.0, start_at - time.time()))
+    timed(samples, "login", lambda: session.request("POST", "/login", {"email": seeding.PROFESSOR}))
+    deadline, n = start_at + duration, 0
+    while time.time() < deadline:
+        n += 1
+        fields = {"title": f"수업 중 업로드 {n}", "content": "부하 테스트 자료", "link1": ""}
+        files = {"files": (f"live_{n}_{uuid.uuid4().hex[:6]}.pdf", blob)}
+        timed(samples, "upload_lecture", lambda: session.request("POST", "/upload_lecture", fields, files))
+        time.sleep(2.0)
+    return samples
+
+
+def _student_proc(args):
+    host, port, email, plan, start_at, duration, rng_seed = args
+    return student(HttpSession(host, port), email, plan, start_at, duration, rng_seed)
+
+
+def _professor_proc(args):
+    host, port, plan, start_at, duration, upload_mb = args
+    return professor(HttpSession(host, port), plan, start_at, duration, upload_mb)
+
+
+# ───────────── 실행 모드 ─────────────
+def run_client(plan, args):
+    """Flask test client — 네트워크/gunicorn 없이 앱·저장소 코드만 측정 (학생 1명 = 스레드 1개)"""
+    os.chdir(plan["workdir"])
+    os.environ["STORAGE_BACKEND"] = plan["backend"]
+    sys.path.insert(0, plan["app_root"])
+    import app as hwat   # noqa: E402  (seed와 같은 작업 폴더 기준)
+
+    hwat.app.config["TESTING"] = True
+    if hasattr(hwat, "startup_check"):   # gunicorn post_worker_init 과 같은 기동 점검 (예전 게시자료 연결 등)
+        hwat.startup_check()
+    results, lock = [], threading.Lock()
+    start_at = time.time() + 1.0
+
+    def collect(fn, *fn_args):
+        samples = fn(*fn_args)
+        with lock:
+            results.extend(samples)
+
+    threads = [
+        threading.Thread(target=collect, args=(
+            student, ClientSession(hwat.app), seeding.student_email(i), plan, start_at, args.duration, i))
+        for i in range(args.users)
+    ]
+    threads.append(threading.Thread(target=collect, args=(
+        professor, ClientSession(hwat.app), plan, start_at, args.duration, args.upload_mb)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.time() - start_at
+
+
+def wait_ready(port, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn이 시작하지 못했습니다 (gunicorn.log 확인)")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/login")   # 예전 checkout에는 /health 가 없다
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError("gunicorn 응답 없음")
+
+
+def run_gunicorn(plan, args):
+    """gunicorn(app_root/gunicorn.conf.py) 실행 후 학생마다 별도 프로세스로 접속"""
+    env = dict(
+        os.environ,
+        PORT=str(args.port),
+        STORAGE_BACKEND=plan["backend"],
+        WEB_CONCURRENCY=str(args.workers),
+        PYTHONPATH=plan["app_root"],
+    )
+    conf = os.path.join(plan["app_root"], "gunicorn.conf.py")
+    if os.path.exists(conf):
+        command = ["-c", conf]
+    else:
+        command = ["--workers", str(args.workers), "--bind", f"0.0.0.0:{args.port}"]
+    log = open(os.path.join(plan["workdir"], "gunicorn.log"), "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *command, "app:app"],
+        cwd=plan["workdir"], env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_ready(args.port, proc)
+        start_at = time.time() + 2.0
+        host = "127.0.0.1"
+        jobs = [(host, args.port, seeding.student_email(i), plan, start_at, args.duration, i) for i in range(args.users)]
+        with multiprocessing.Pool(args.users + 1) as pool:
+            prof = pool.apply_async(_professor_proc, ((host, args.port, plan, start_at, args.duration, args.upload_mb),))
+            results = [s for batch in pool.map(_student_proc, jobs) for s in batch] + prof.get()
+        return results, time.time() - start_at
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        log.close()
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    meta = baseline["meta"]
+    print(f"\n기준값 대비 ({baseline_path}: {meta.get('git')} {meta['backend']}/{meta['mode']})", file=sys.stderr)
+    for name in ENDPOINTS + ("total",):
+        old, new = baseline["endpoints"].get(name, {}), current["endpoints"][name]
+        if old.get("p95_ms") and new.get("p95_ms"):
+            change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            print(f"  {name:<15} p95 {old['p95_ms']:>9.1f}ms → {new['p95_ms']:>9.1f}ms ({change:+.0f}%)"
+                  f"   rps {old['rps']} → {new['rps']}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--backend", choices=["sqlite", "csv"], default="sqlite")
+    parser.add_argument("--users", type=int, default=50, help="동시 접속 학생 수")
+    parser.add_argument("--duration", type=float, default=20.0, help="측정 시간(초)")
+    parser.add_argument("--think", type=float, default=0.5, help="학생 요청 사이 최대 대기(초)")
+    parser.add_argument("--workers", type=int, default=3, help="gunicorn 워커 수")
+    parser.add_argument("--port", type=int, default=18025)
+    parser.add_argument("--upload-mb", type=int, default=4, help="교수 업로드 파일 크기")
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--file-mb", type=int, default=4)
+    parser.add_argument("--workdir", default=None, help="작업 폴더 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--out", default=None, help="결과 JSON 파일 (기본: 표준 출력)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--app-root", default=ROOT, help="측정할 앱 checkout (기본: 이 저장소)")
+    args = parser.parse_args()
+    app_root = os.path.abspath(args.app_root)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="hwat25-load-")
+    try:
+        # 시딩은 별도 프로세스 (측정 프로세스에 시딩용 상태가 남지 않도록)
+        out = subprocess.run(
+            [sys.executable, os.path.join(BENCH_DIR, "seed.py"), "--workdir", workdir, "--backend", args.backend,
+             "--posts", str(args.posts), "--questions", str(args.questions), "--comments", str(args.comments),
+             "--files", str(args.files), "--file-mb", str(args.file_mb), "--students", str(args.users),
+             "--app-root", app_root],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        plan = dict(json.loads(out.strip().splitlines()[-1]), think=args.think)
+
+        runner = run_client if args.mode == "client" else run_gunicorn
+        samples, elapsed = runner(plan, args)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "mode": args.mode,
+            "backend": args.backend,
+            "users": args.users,
+            "duration_s": round(elapsed, 2),
+            "workers": args.workers if args.mode == "gunicorn" else None,
+            "seed": {k: plan[k] for k in ("posts", "questions", "comments", "file_mb")} | {"files": len(plan["files"])},
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "app_root": app_root,
+            "git": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=app_root, capture_output=True,
+                                  text=True).stdout.strip() or None,
+        },
+        "endpoints": summarize(samples, elapsed),
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
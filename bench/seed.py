@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+🌱 벤치마크용 데이터 생성 — 수업 한 학기 분량을 흉내 낸 게시자료/Q&A/첨부파일
+작업 폴더(기본: 임시 폴더)에 allowed_emails.txt, 기존 CSV 파일(uploads_data.csv, posts_data.csv,
+questions.csv, comments.csv — 처음 버전과 같은 열 구성)과 uploads/ 의 일반 파일을 만든다.
+app 모듈을 import 하지 않고 디스크 형식으로만 쓰므로 예전 checkout(load_csv/save_csv 방식)도 그대로 읽는다.
+--app-root 의 앱에 migrate-files 명령이 있으면 이어서 실행해 해시 저장소(uploads/.blobs)로 옮긴다
+(sqlite 저장소는 이때 CSV를 가져와 DB를 만든다).
+
+    python bench/seed.py --workdir /tmp/hwat25-bench --backend csv
+    python bench/seed.py --workdir /tmp/hwat25-bench --posts 500 --questions 5000 --file-mb 8
+    python bench/seed.py --workdir /tmp/hwat25-base --app-root /tmp/hwat25-baseline   # 예전 checkout용
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFESSOR = "professor@bench.local"
+RETENTION_DAYS = 15   # 게시자료 보관 기간 — 이보다 오래된 날짜는 /lecture 에서 지워진다
+
+# 처음 버전(load_csv)이 기대하는 파일명과 열 순서 — 열이 다르면 빈 표로 읽으므로 그대로 맞춘다
+CSV_FILES = {
+    "uploads": ("uploads_data.csv", ["title", "content", "files", "links", "date", "confirmed"]),
+    "posts": ("posts_data.csv", ["title", "content", "files", "links", "date", "confirmed"]),
+    "questions": ("questions.csv", ["id", "title", "content", "email", "date"]),
+    "comments": ("comments.csv", ["question_id", "comment", "email", "date"]),
+}
+
+
+def student_email(n):
+    return f"student{n:03d}@bench.local"
+
+
+def write_allowlist(workdir, students):
+    with open(os.path.join(workdir, "allowed_emails.txt"), "w", encoding="utf-8") as f:
+        f.write(PROFESSOR + "\n")
+        for n in range(students):
+            f.write(student_email(n) + "\n")
+
+
+def write_table(workdir, table, rows):
+    path, cols = CSV_FILES[table]
+    with open(os.path.join(workdir, path), "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def has_command(app_root, name):
+    """app_root/app.py 에 flask CLI 명령이 있는지 (예전 checkout에는 없다)"""
+    try:
+        with open(os.path.join(app_root, "app.py"), encoding="utf-8") as f:
+            return f'@app.cli.command("{name}")' in f.read()
+    except OSError:
+        return False
+
+
+def seed(workdir, backend="sqlite", posts=300, questions=2000, comments=5000, files=12, file_mb=4, students=50,
+         rng_seed=25, app_root=ROOT):
+    """작업 폴더에 데이터 생성 후 요약(dict) 반환"""
+    os.makedirs(os.path.join(workdir, "uploads"), exist_ok=True)
+    write_allowlist(workdir, students)
+
+    rng = random.Random(rng_seed)
+    now = datetime.now()
+    stamp = now.strftime("%Y-%m-%d %H:%M")
+
+    # 첨부파일 (multi-MB, 내용은 파일마다 다름) — uploads/ 에 일반 파일로
+    names = []
+    for i in range(files):
+        name = f"{i + 1:02d}주차_강의자료.pdf" if i % 2 == 0 else f"{i + 1:02d}주차_실습.pptx"
+        with open(os.path.join(workdir, "uploads", name), "wb") as out:
+            for _ in range(file_mb):
+                out.write(rng.randbytes(1024 * 1024))
+        names.append(name)
+
+    # 업로드 자료 + 게시자료 (보관 기간 안의 날짜, 같은 제목·날짜로 1:1 — 새 버전은 기동 시 upload_id로 연결)
+    paragraph = "이번 주차 강의에서는 회로 해석과 측정 실습을 다룹니다. 실습 전 자료를 미리 확인하세요. " * 4
+    upload_rows = []
+    for i in range(posts):
+        date = (now - timedelta(days=rng.randrange(RETENTION_DAYS))).strftime("%Y-%m-%d")
+        attached = ";".join(rng.sample(names, k=min(len(names), rng.randrange(3))))
+        upload_rows.append({
+            "title": f"{i % 15 + 1}주차 강의자료 {i + 1}",
+            "content": paragraph,
+            "files": attached,
+            "links": "https://www.youtube.com/watch?v=bench",
+            "date": date,
+            "confirmed": "yes",
+        })
+    write_table(workdir, "uploads", upload_rows)
+    write_table(workdir, "posts", upload_rows)
+
+    # Q&A
+    question_rows = [
+        {
+            "id": i + 1,
+            "title": f"질문 {i + 1}: 과제 제출 관련",
+            "content": "실습 보고서 양식과 제출 기한이 궁금합니다. " * 2,
+            "email": student_email(rng.randrange(students)),
+            "date": (now - timedelta(minutes=questions - i)).strftime("%Y-%m-%d %H:%M"),
+        }
+        for i in range(questions)
+    ]
+    comment_rows = [
+        {
+            "question_id": rng.randrange(questions) + 1,
+            "comment": "저도 같은 부분이 궁금했습니다. 답변 감사합니다.",
+            "email": student_email(rng.randrange(students)) if i % 5 else PROFESSOR,
+            "date": stamp,
+        }
+        for i in range(comments if questions else 0)
+    ]
+    write_table(workdir, "questions", question_rows)
+    write_table(workdir, "comments", comment_rows)
+
+    migrated = has_command(app_root, "migrate-files")
+    if migrated:
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", os.path.join(app_root, "app.py"), "migrate-files"],
+            cwd=workdir, env=dict(os.environ, STORAGE_BACKEND=backend), check=True, capture_output=True,
+        )
+
+    return {
+        "workdir": workdir,
+        "app_root": app_root,
+        "backend": backend,
+        "blobs": migrated,
+        "posts": posts,
+        "questions": questions,
+        "comments": len(comment_rows),
+        "files": names,
+        "file_mb": file_mb,
+        "students": students,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workdir", required=True)
+    parser.add_argument("--backend", choices=["sqlite", "csv"], default="sqlite")
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--file-mb", type=int, default=4)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--app-root", default=ROOT, help="측정할 앱 checkout (기본: 이 저장소)")
+    args = parser.parse_args()
+    summary = seed(
+        os.path.abspath(args.workdir), args.backend, args.posts, args.questions, args.comments,
+        args.files, args.file_mb, args.students, app_root=os.path.abspath(args.app_root),
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
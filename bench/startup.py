@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+⏱️ 워커 기동 벤치마크 — app import 시간과 워커 1개당 메모리(RSS)
+gunicorn 워커는 preload_app=False 이므로 워커마다 `import app`을 새로 한다.
+새 파이썬 프로세스에서 이를 여러 번 재현해 중앙값을 재고, 기준을 넘으면 실패(종료 코드 1).
+
+    python bench/startup.py                       # 5회 측정, 결과 JSON 출력
+    python bench/startup.py --runs 10 --max-import-ms 800 --max-rss-mb 80
+    python bench/startup.py --top 15              # import 시간이 큰 모듈 (python -X importtime)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행: import app 시간(ms)과 RSS(MB), 로드된 모듈 수
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - t0) * 1000
+rss = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+heavy = sorted(m for m in ("pandas", "numpy", "bs4", "skyfield", "chardet") if m in sys.modules)
+print(json.dumps({"import_ms": elapsed, "rss_mb": rss, "modules": len(sys.modules), "heavy": heavy}))
+"""
+
+
+def run_probe(workdir, env):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=workdir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def top_imports(workdir, env, n):
+    """python -X importtime 결과에서 누적 시간이 큰 최상위 패키지 n개"""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=workdir, env=env, capture_output=True, text=True
+    ).stderr
+    totals = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and "." not in name:
+            totals[name] = max(totals.get(name, 0), int(cumulative) / 1000)
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None, help="import 시간 중앙값 상한")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="워커 RSS 중앙값 상한")
+    parser.add_argument("--top", type=int, default=0, help="import 시간이 큰 패키지 표시")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    with tempfile.TemporaryDirectory(prefix="hwat25-bench-") as workdir:   # 실제 데이터/업로드 폴더는 건드리지 않음
+        run_probe(workdir, env)   # 첫 실행(.pyc 생성, SQLite 스키마 생성)은 제외
+        samples = [run_probe(workdir, env) for _ in range(args.runs)]
+        top = top_imports(workdir, env, args.top) if args.top else []
+
+    result = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": {"median": statistics.median(s["import_ms"] for s in samples),
+                      "max": max(s["import_ms"] for s in samples)},
+        "rss_mb": {"median": statistics.median(s["rss_mb"] for s in samples),
+                   "max": max(s["rss_mb"] for s in samples)},
+        "modules": samples[-1]["modules"],
+        "heavy_modules": samples[-1]["heavy"],
+    }
+    if top:
+        result["top_imports_ms"] = dict(top)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    failures = []
+    if args.max_import_ms is not None and result["import_ms"]["median"] > args.max_import_ms:
+        failures.append(f"import {result['import_ms']['median']:.0f}ms > {args.max_import_ms:.0f}ms")
+    if args.max_rss_mb is not None and result["rss_mb"]["median"] > args.max_rss_mb:
+        failures.append(f"RSS {result['rss_mb']['median']:.1f}MB > {args.max_rss_mb:.1f}MB")
+    if result["heavy_modules"]:
+        failures.append(f"요청 경로에 무거운 모듈 로드됨: {', '.join(result['heavy_modules'])}")
+    for f in failures:
+        print(f"[BENCH] ❌ {f}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+📦 강의자료 묶음 가져오기/내보내기
+- Bundle        : zip 파일, 폴더, manifest 파일 하나를 같은 방식으로 읽는다
+                  manifest.json  {"items": [{"title", "content", "links", "files", "publish"}, ...]}
+                  manifest.csv   title,content,links,files,publish  (links/files는 ';' 구분)
+                  files 는 manifest 기준 상대 경로 — 빠진 파일이 있으면 아무것도 쓰기 전에 BundleError
+- write_archive : 저장소 전체(data/<table>.csv) + 업로드 파일(files/<이름>) → zip
+                  내보낸 zip의 manifest.json 에도 items 가 있어 다음 학기에 그대로 가져올 수 있다
+"""
+
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+
+from filestore import safe_name
+
+FORMAT = 1
+MANIFEST_NAMES = ("manifest.json", "manifest.csv")
+
+
+class BundleError(Exception):
+    """묶음 형식 오류 (manifest 없음, 빠진 파일, 제목 없는 항목 등)"""
+
+
+def _split(value):
+    if isinstance(value, str):
+        value = value.split(";")
+    return [str(v).strip() for v in value or [] if str(v).strip()]
+
+
+def _truthy(value):
+    return value is True or str(value).strip().lower() in ("1", "yes", "y", "true")
+
+
+def _item(raw, n):
+    if not isinstance(raw, dict):
+        raise BundleError(f"{n}번째 항목: 형식 오류")
+    title = str(raw.get("title") or "").strip()
+    if not title:
+        raise BundleError(f"{n}번째 항목: 제목이 없습니다")
+    return {
+        "title": title,
+        "content": str(raw.get("content") or "").strip(),
+        "links": _split(raw.get("links")),
+        "files": [f.removeprefix("./") for f in _split(raw.get("files"))],
+        "publish": _truthy(raw.get("publish")),
+    }
+
+
+class Bundle:
+    """source: zip 경로/파일 객체, 폴더 경로, manifest.json/csv 경로"""
+
+    def __init__(self, source):
+        self._zip = None
+        self.root = None
+        if isinstance(source, str) and os.path.isdir(source):
+            self.root, manifest = source, self._find_manifest(os.listdir(source))
+        elif isinstance(source, str) and source.lower().endswith((".json", ".csv")):
+            self.root, manifest = os.path.dirname(source) or ".", os.path.basename(source)
+        else:
+            try:
+                self._zip = zipfile.ZipFile(source)
+            except (zipfile.BadZipFile, OSError) as e:
+                raise BundleError(f"zip 파일을 열 수 없습니다 ({e})") from e
+            manifest = self._find_manifest(self._zip.namelist())
+        # 폴더째 압축한 zip(강의/manifest.json)도 받도록, manifest가 있는 위치를 기준 경로로
+        self.prefix = manifest.rpartition("/")[0]
+        self.manifest = self._read_manifest(manifest)
+        self.items = [_item(raw, n) for n, raw in enumerate(self.manifest.get("items", []), start=1)]
+        problems = []
+        for item in self.items:
+            for path in item["files"]:
+                if not self.has(path):
+                    problems.append(f"'{item['title']}': 파일 없음 {path}")
+                elif not safe_name(os.path.basename(path)):
+                    problems.append(f"'{item['title']}': 쓸 수 없는 파일명 {path}")
+        if problems:
+            raise BundleError("; ".join(problems))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    @staticmethod
+    def _find_manifest(names):
+        found = sorted((n for n in names if n.rpartition("/")[2] in MANIFEST_NAMES), key=lambda n: n.count("/"))
+        if not found:
+            raise BundleError("manifest.json 또는 manifest.csv 가 없습니다")
+        return found[0]
+
+    def _member(self, path):
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def _local_path(self, path):
+        """폴더 묶음 안의 실제 경로 (../ 등으로 밖을 가리키면 None)"""
+        root = os.path.realpath(self.root)
+        full = os.path.realpath(os.path.join(root, path))
+        return full if os.path.commonpath([root, full]) == root else None
+
+    def has(self, path):
+        if self._zip is not None:
+            try:
+                self._zip.getinfo(self._member(path))
+                return True
+            except KeyError:
+                return False
+        full = self._local_path(path)
+        return full is not None and os.path.isfile(full)
+
+    def open(self, path):
+        """묶음 안 파일 → 바이너리 스트림 (압축을 풀어 디스크에 두지 않고 바로 읽는다)"""
+        if self._zip is not None:
+            return self._zip.open(self._member(path))
+        return open(self._local_path(path), "rb")
+
+    def _read_manifest(self, name):
+        path = name.rpartition("/")[2]
+        with self.open(path) as f:
+            text = io.TextIOWrapper(f, encoding="utf-8-sig")
+            if path.endswith(".csv"):
+                return {"items": list(csv.DictReader(text))}
+            try:
+                data = json.load(text)
+            except ValueError as e:
+                raise BundleError(f"manifest.json 형식 오류 ({e})") from e
+        return {"items": data} if isinstance(data, list) else data
+
+    def tables(self):
+        """내보낸 zip의 저장소 테이블 → {table: 행 목록} (write_archive 로 만든 묶음만)"""
+        result = {}
+        for table, path in (self.manifest.get("tables") or {}).items():
+            if not self.has(path):
+                raise BundleError(f"테이블 파일 없음: {path}")
+            with self.open(path) as f:
+                result[table] = list(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig")))
+        return result
+
+
+def write_archive(out, tables, files, items):
+    """out(경로 또는 쓰기 가능한 파일)에 zip 작성
+
+    tables: {table: (열 목록, 행 목록)}, files: [(파일명, 실제 경로)], items: 가져오기용 항목
+    pdf/pptx 는 이미 압축된 형식이라 그대로(STORED) 넣는다.
+    """
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        manifest = {
+            "format": FORMAT,
+            "exported": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "items": items,
+            "tables": {table: f"data/{table}.csv" for table in tables},
+        }
+        z.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1))
+        for table, (cols, rows) in tables.items():
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=cols, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            z.writestr(f"data/{table}.csv", buf.getvalue())
+        for name, path in files:
+            z.write(path, f"files/{name}", compress_type=zipfile.ZIP_STORED)
+    return len(files)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+📂 업로드 파일 저장 (스트리밍 + 크기 제한 + SHA-256)
+- BlobStore      : 내용 해시(SHA-256) 기준 저장소 — 같은 파일은 한 번만 저장
+- save_stream    : 고정 크기 청크로 임시 파일에 기록하며 해시 계산 → BlobStore로 원자적 이동
+- ChunkedUploads : 대용량 자료용 이어받기(resumable) 청크 업로드 (중단된 업로드는 sweep()으로 정리)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from storage import file_lock
+
+CHUNK_SIZE = 1024 * 1024   # 1MB 단위로 읽고 쓴다
+
+
+class UploadTooLarge(Exception):
+    """파일 크기 제한 초과"""
+
+
+class UploadError(Exception):
+    """잘못된 청크 업로드 요청 (없는 업로드, 오프셋 불일치 등)"""
+
+
+def safe_name(filename):
+    """업로드 파일명 정리 (한글 유지, 경로 구분자/공백 제거)"""
+    name = filename.replace(" ", "_").replace("/", "").replace("\\", "")
+    name = name.lstrip(".")
+    return name or None
+
+
+def _fsync_replace(tmp_path, dest_path):
+    """임시 파일 내용을 디스크에 확정한 뒤 최종 경로로 원자적 교체"""
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest_path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ───────────── 내용 주소(해시) 기반 저장소 ─────────────
+class BlobStore:
+    """root/<해시 앞 2자리>/<sha256> 에 파일 1개씩 저장 (파일명과 무관하게 내용이 같으면 공유)"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def adopt(self, tmp_path, sha256):
+        """임시 파일을 해시 위치로 옮긴다 — 같은 내용이 이미 있으면 임시 파일만 지운다"""
+        dest = self.path(sha256)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _fsync_replace(tmp_path, dest)
+        return True
+
+    def scan(self):
+        """저장된 파일 전체 (sha256, 크기, mtime) — 임시 파일(.으로 시작)은 제외"""
+        for sub in sorted(os.listdir(self.root)):
+            subdir = os.path.join(self.root, sub)
+            if sub.startswith(".") or not os.path.isdir(subdir):
+                continue
+            with os.scandir(subdir) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    yield entry.name, st.st_size, st.st_mtime
+
+    def remove(self, sha256):
+        try:
+            os.remove(self.path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+def save_stream(src, blobs, max_bytes, chunk_size=CHUNK_SIZE):
+    """src(read 가능한 스트림)를 BlobStore에 저장하고 (크기, sha256) 반환
+
+    저장소 안의 임시 파일에 청크 단위로 쓰고, 끝까지 받은 경우에만 rename 하므로
+    중간에 실패해도 반쪽짜리 파일이 남지 않는다.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=blobs.root, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{max_bytes // (1024 * 1024)}MB 초과")
+                digest.update(chunk)
+                out.write(chunk)
+        blobs.adopt(tmp_path, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size, digest.hexdigest()
+
+
+# ───────────── 이어받기 청크 업로드 ─────────────
+class ChunkedUploads:
+    """staging_dir/<id>.part 에 순서대로 이어 쓰고, 다 받으면 최종 위치로 옮긴다.
+
+    요청 하나는 청크 하나만 처리하므로 100MB 이상 자료도 워커를 오래 붙잡지 않는다.
+    """
+
+    def __init__(self, staging_dir, max_bytes):
+        self.staging_dir = staging_dir
+        self.max_bytes = max_bytes
+        os.makedirs(staging_dir, exist_ok=True)
+
+    def _paths(self, upload_id):
+        if not upload_id.isalnum():
+            raise UploadError("잘못된 업로드 ID")
+        base = os.path.join(self.staging_dir, upload_id)
+        return base + ".part", base + ".json"
+
+    def start(self, filename, size):
+        name = safe_name(filename or "")
+        if not name:
+            raise UploadError("파일명이 없습니다")
+        if size > self.max_bytes:
+            raise UploadTooLarge(f"{name}: {self.max_bytes // (1024 * 1024)}MB 초과")
+        upload_id = uuid.uuid4().hex
+        part, meta = self._paths(upload_id)
+        open(part, "wb").close()
+        with open(meta, "w", encoding="utf-8") as f:
+            json.dump({"name": name, "size": size}, f, ensure_ascii=False)
+        return upload_id
+
+    def status(self, upload_id):
+        part, meta = self._paths(upload_id)
+        if not os.path.exists(meta):
+            raise UploadError("업로드를 찾을 수 없습니다")
+        with open(meta, encoding="utf-8") as f:
+            info = json.load(f)
+        info["received"] = os.path.getsize(part)
+        return info
+
+    def write(self, upload_id, offset, src, chunk_size=CHUNK_SIZE):
+        """offset 위치부터 src를 이어 쓴다 — offset은 지금까지 받은 크기와 같아야 한다
+
+        같은 청크를 두 번 보내는 재시도가 겹쳐도 한쪽만 쓰도록 업로드별 잠금 안에서 확인하고 쓴다.
+        """
+        part, _ = self._paths(upload_id)
+        with file_lock(part):
+            return self._write(upload_id, offset, src, chunk_size)
+
+    def _write(self, upload_id, offset, src, chunk_size):
+        info = self.status(upload_id)
+        if offset != info["received"]:
+            raise UploadError(f"오프셋 불일치 (받은 크기 {info['received']})")
+        part, _ = self._paths(upload_id)
+        received = offset
+        with open(part, "ab") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > info["size"]:
+                    out.truncate(offset)
+                    raise UploadError("선언한 파일 크기를 초과했습니다")
+                out.write(chunk)
+        info["received"] = received
+        return info
+
+    def finish(self, upload_id, blobs):
+        """다 받은 파일의 해시를 계산해 BlobStore로 옮기고 (이름, 크기, sha256) 반환"""
+        part, meta = self._paths(upload_id)
+        with file_lock(part):
+            info = self.status(upload_id)
+            if info["received"] != info["size"]:
+                raise UploadError("아직 모든 청크를 받지 못했습니다")
+            sha256 = file_sha256(part)
+            blobs.adopt(part, sha256)
+            os.remove(meta)
+        return info["name"], info["size"], sha256
+
+    def sweep(self, max_age):
+        """max_age(초) 동안 이어 쓰지 않은 미완성 업로드 삭제 (완료된 업로드가 남긴 잠금 파일 포함). 삭제한 업로드 수 반환"""
+        cutoff = time.time() - max_age
+        upload_ids = {
+            entry.partition(".")[0] for entry in os.listdir(self.staging_dir)
+            if entry.endswith((".part", ".json", ".part.lock"))
+        }
+        removed = 0
+        for upload_id in upload_ids:
+            if not upload_id.isalnum():
+                continue
+            part, meta = self._paths(upload_id)
+            with file_lock(part):
+                paths = [p for p in (part, meta) if os.path.exists(p)]
+                if any(os.path.getmtime(p) >= cutoff for p in paths):
+                    continue
+                for p in paths:
+                    os.remove(p)
+                removed += bool(paths)
+            # 잠금을 놓은 뒤 잠금 파일도 — 뒤늦게 온 요청은 meta가 없어 어차피 실패한다
+            try:
+                os.remove(part + ".lock")
+            except FileNotFoundError:
+                pass
+        return removed
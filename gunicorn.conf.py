@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+🚀 gunicorn 설정 (Render / 로컬 공통)
+    gunicorn -c gunicorn.conf.py app:app
+
+기본값은 gthread 워커(프로세스 × 스레드)로, 큰 파일 업로드/다운로드 하나가
+다른 학생들의 요청을 막지 않도록 한다. 환경변수로 조정:
+    WEB_CONCURRENCY        워커 프로세스 수 (기본: CPU 수 × 2 + 1, 최대 8)
+    GUNICORN_WORKER_CLASS  gthread(기본) / gevent / sync
+    GUNICORN_THREADS       gthread 워커당 스레드 수 (기본 8)
+    GUNICORN_TIMEOUT       요청 제한 시간(초), 대용량 자료 기준 (기본 300)
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))   # gevent 전용
+
+# gevent가 설치되지 않은 환경(로컬 등)에서는 gthread로 대체
+if worker_class == "gevent" and importlib.util.find_spec("gevent") is None:
+    logging.getLogger("gunicorn.error").warning("gevent 미설치 → gthread 워커 사용")
+    worker_class = "gthread"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))   # 느린 회선의 대용량 업로드 허용
+graceful_timeout = 30
+keepalive = 5                                              # 강의실 동시 접속 시 연결 재사용
+
+# 메모리 누수 대비 워커 주기적 교체 (동시에 모두 재시작하지 않도록 jitter)
+max_requests = 2000
+max_requests_jitter = 200
+
+# 앱은 워커마다 따로 import (SQLite 연결·백그라운드 스레드가 fork 이후에 생성되도록)
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    """워커 기동 직후 저장소/업로드 폴더/허용 목록 점검 (Render와 로컬에서 동일하게 실행)"""
+    from app import startup_check
+
+    for problem in startup_check():
+        worker.log.warning(f"[STARTUP] {problem}")
+    worker.log.info(f"[STARTUP] worker {worker.pid} 준비 완료 ({worker_class}, threads={threads})")
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+📈 관측 도구 (워커 프로세스별)
+- Registry        : 고정 구간 히스토그램 + 카운터 (메모리 상한 있음), Prometheus 텍스트 출력
+- timer / timed   : with 블록·함수 실행 시간 기록
+- setup_logging   : print 대신 쓰는 구조화 로그 (LOG_FORMAT=json 이면 한 줄 JSON)
+gunicorn 워커마다 값이 따로 쌓이므로 /metrics 에는 pid 라벨을 붙인다.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# 지연 시간 구간(초) — 구간별 개수만 저장하므로 요청이 아무리 많아도 메모리는 일정
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DESCRIPTIONS = {
+    "hwat25_http_request_seconds": "라우트별 요청 처리 시간",
+    "hwat25_template_render_seconds": "템플릿 렌더링 시간",
+    "hwat25_storage_seconds": "저장소 읽기/쓰기 시간 (load_csv, save_csv, sqlite)",
+    "hwat25_search_seconds": "검색 시간 (색인 갱신 포함)",
+    "hwat25_preview_seconds": "미리보기 생성 시간 (백그라운드)",
+    "hwat25_file_bytes_served_total": "uploaded_file 로 전송한 바이트",
+    "hwat25_file_requests_total": "uploaded_file 요청 수 (응답 코드별)",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # 마지막 칸 = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 근사 분위수"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Registry:
+    """이름 + 라벨별 히스토그램/카운터. 라벨 조합은 max_series 개까지만 만들고 나머지는 'other'로 합친다."""
+
+    def __init__(self, max_series=500):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._hists = {}
+        self._counters = {}
+        self.started = time.time()
+
+    def _key(self, table, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in table and len(self._hists) + len(self._counters) >= self.max_series:
+            key = (name, (("overflow", "other"),))
+        return key
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            key = self._key(self._hists, name, labels)
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            key = self._key(self._counters, name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def timed(self, name, **labels):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """메트릭 페이지용 — 히스토그램(느린 순)과 카운터 목록"""
+        with self._lock:
+            hists = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "avg_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": (h.quantile(0.50) or 0) * 1000,
+                    "p95_ms": (h.quantile(0.95) or 0) * 1000,
+                    "p99_ms": (h.quantile(0.99) or 0) * 1000,
+                    "max_ms": h.max * 1000,
+                    "total_s": h.sum,
+                }
+                for (name, labels), h in self._hists.items()
+            ]
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+        hists.sort(key=lambda h: h["total_s"], reverse=True)
+        counters.sort(key=lambda c: (c["name"], sorted(c["labels"].items())))
+        return hists, counters
+
+    def prometheus(self, gauges=None):
+        """Prometheus text exposition format (0.0.4). gauges: {이름: 값} — 캐시 크기 등 현재 상태"""
+        pid = str(os.getpid())
+
+        def fmt(labels, **extra):
+            items = dict(labels, pid=pid, **extra)
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(items.items()))
+            return "{" + body + "}"
+
+        lines = []
+        with self._lock:
+            hists = sorted(self._hists.items())
+            counters = sorted(self._counters.items())
+        for name in sorted({n for (n, _), _ in hists}):
+            lines += [f"# HELP {name} {DESCRIPTIONS.get(name, name)}", f"# TYPE {name} histogram"]
+            for (n, labels), h in hists:
+                if n != name:
+                    continue
+                labels = dict(labels)
+                cumulative = 0
+                for bound, c in zip(BUCKETS + (float("inf"),), h.counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{fmt(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        for name in sorted({n for (n, _), _ in counters}):
+            lines += [f"# HELP {name} {DESCRIPTIONS.get(name, name)}", f"# TYPE {name} counter"]
+            lines += [f"{name}{fmt(dict(labels))} {value}" for (n, labels), value in counters if n == name]
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE {name} gauge", f"{name}{fmt({})} {value}"]
+        lines += ["# TYPE hwat25_process_start_time_seconds gauge",
+                  f"hwat25_process_start_time_seconds{fmt({})} {self.started:.0f}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+timer = registry.timer
+timed = registry.timed
+
+
+# ───────────── 구조화 로그 ─────────────
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    """log.info(..., extra={...}) 로 넘긴 값"""
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        extra = " ".join(f"{k}={v}" for k, v in _fields(record).items())
+        return f"{text} {extra}" if extra else text
+
+
+def setup_logging(fmt=None, level=None):
+    """'hwat25' 로거 설정 (여러 번 불러도 한 번만). LOG_FORMAT=json|text, LOG_LEVEL=INFO"""
+    logger = logging.getLogger("hwat25")
+    if logger.handlers:
+        return logger
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level or os.environ.get("LOG_LEVEL", "INFO"))
+    logger.propagate = False
+    return logger
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+🖼️ 강의자료 미리보기 (첫 장 썸네일 + 쪽/슬라이드 수 + 본문 발췌)
+- 내용 해시(sha256) 기준으로 uploads/.previews 에 저장 → 같은 파일은 한 번만 만든다
+- 업로드 요청은 기다리지 않는다: submit()은 작업 큐에 넣고 바로 반환, 워커 스레드가 만든다
+- pptx : 표준 라이브러리만으로 (슬라이드 수, 슬라이드 글자, PowerPoint가 넣어 둔 docProps/thumbnail.jpeg)
+         내장 썸네일이 없으면 LibreOffice(soffice)가 있을 때만 첫 슬라이드를 그림으로 변환
+- pdf  : 쪽수는 파일 구조에서 읽고, 썸네일/발췌는 poppler(pdftoppm/pdftotext)가 있을 때만
+도구가 없거나 실패한 항목은 비워 둔 채 결과를 저장하고 다시 시도하지 않는다 (flask build-previews --force 로 재생성).
+"""
+
+import concurrent.futures
+import html
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+
+import metrics
+
+log = logging.getLogger("hwat25.previews")
+
+FORMAT = 1             # 저장 형식이 바뀌면 올려서 다시 만들게 한다
+KINDS = {".pdf": "pdf", ".pptx": "pptx"}
+THUMB_WIDTH = 320      # 썸네일 가로(px)
+SNIPPET_CHARS = 200    # 본문 발췌 길이
+SNIPPET_SLIDES = 3     # pptx는 앞쪽 슬라이드 몇 장의 글자만
+TOOL_TIMEOUT = 60      # 외부 도구 1회 제한 시간(초)
+
+_SLIDE = re.compile(r"ppt/slides/slide(\d+)\.xml$")
+_TEXT_RUN = re.compile(rb"<a:t(?:\s[^>]*)?>([^<]*)</a:t>")
+_PDF_PAGES = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+_PDF_PAGE = re.compile(rb"/Type\s*/Page\b")
+
+
+def kind_of(name):
+    return KINDS.get(os.path.splitext(name or "")[1].lower())
+
+
+def _clip(text):
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rstrip() + "…"
+
+
+class Previews:
+    """sha256 → 미리보기 (root/<해시 앞 2자리>/<sha256>.json + 썸네일)"""
+
+    def __init__(self, root, blobs, workers=2):
+        self.root = root
+        self.blobs = blobs
+        self.workers = workers
+        os.makedirs(root, exist_ok=True)
+        self.tools = {name: shutil.which(name) for name in ("pdftoppm", "pdftotext", "soffice")}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._pending = set()
+        self._done = {}   # 완성된 미리보기는 바뀌지 않으므로 워커 메모리에 보관
+
+    def path(self, sha256, suffix=".json"):
+        return os.path.join(self.root, sha256[:2], sha256 + suffix)
+
+    def get(self, sha256):
+        """저장된 미리보기 정보 (아직 없으면 None)"""
+        meta = self._done.get(sha256)
+        if meta is None:
+            try:
+                with open(self.path(sha256), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if meta.get("format") != FORMAT:
+                return None
+            self._done[sha256] = meta
+        return meta
+
+    def thumb_path(self, sha256):
+        meta = self.get(sha256)
+        return self.path(sha256, meta["thumb"]) if meta and meta.get("thumb") else None
+
+    # ── 백그라운드 생성 ──
+    def _executor(self):
+        # gunicorn 워커(fork)마다 따로 — 부모 프로세스의 스레드는 자식에 없다
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="preview")
+            self._pool_pid = os.getpid()
+            self._pending = set()
+        return self._pool
+
+    def submit(self, sha256, name):
+        """미리보기가 없으면 생성 작업을 큐에 넣는다 (바로 반환). 넣었으면 True"""
+        if not kind_of(name) or self.get(sha256) is not None:
+            return False
+        with self._lock:
+            pool = self._executor()
+            if sha256 in self._pending:
+                return False
+            self._pending.add(sha256)
+        pool.submit(self._run, sha256, name)
+        return True
+
+    def _run(self, sha256, name):
+        try:
+            self.build(sha256, name)
+        except Exception:
+            log.exception("미리보기 생성 실패", extra={"file": name, "sha256": sha256})
+        finally:
+            with self._lock:
+                self._pending.discard(sha256)
+
+    # ── 생성 ──
+    def _acquire(self, sha256):
+        """여러 워커가 같은 파일을 동시에 만들지 않도록 잠금 파일 (오래된 잠금은 무시)"""
+        lock = self.path(sha256, ".lock")
+        os.makedirs(os.path.dirname(lock), exist_ok=True)
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+                return lock
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock) < TOOL_TIMEOUT * 3:
+                        return None
+                    os.remove(lock)
+                except FileNotFoundError:
+                    pass
+        return None
+
+    def build(self, sha256, name, force=False):
+        """미리보기를 만들어 저장하고 정보 반환 (다른 워커가 만드는 중이거나 원본이 없으면 None)"""
+        kind = kind_of(name)
+        src = self.blobs.path(sha256)
+        if not kind or not os.path.exists(src):
+            return None
+        if not force and self.get(sha256) is not None:
+            return self.get(sha256)
+        lock = self._acquire(sha256)
+        if lock is None:
+            return None
+        try:
+            with tempfile.TemporaryDirectory(dir=self.root, prefix=".work-") as work:
+                meta = {"format": FORMAT, "kind": kind, "sha256": sha256, "size": os.path.getsize(src),
+                        "pages": None, "text": "", "thumb": None, "errors": []}
+                with metrics.timer("hwat25_preview_seconds", kind=kind):
+                    try:
+                        (self._pptx if kind == "pptx" else self._pdf)(src, work, meta)
+                    except Exception as e:   # 손상된 파일 등 — 오류를 기록해 두고 다시 시도하지 않음
+                        meta["errors"].append(f"{type(e).__name__}: {e}")
+                thumb = os.path.join(work, "thumb")
+                if meta["thumb"]:
+                    os.replace(thumb + meta["thumb"], self.path(sha256, meta["thumb"]))
+                fd, tmp = tempfile.mkstemp(dir=work, suffix=".json")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(tmp, self.path(sha256))
+        finally:
+            os.remove(lock)
+        self._done[sha256] = meta
+        log.info("미리보기 생성", extra={"file": name, "kind": kind, "pages": meta["pages"],
+                                        "thumb": bool(meta["thumb"]), "errors": len(meta["errors"])})
+        return meta
+
+    def _tool(self, meta, name, *args):
+        """외부 도구 실행 (없으면 None) → stdout"""
+        if not self.tools.get(name):
+            return None
+        try:
+            proc = subprocess.run([self.tools[name], *args], capture_output=True, timeout=TOOL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            meta["errors"].append(f"{name}: {TOOL_TIMEOUT}초 초과")
+            return None
+        if proc.returncode != 0:
+            meta["errors"].append(f"{name}: {proc.stderr.decode('utf-8', 'replace').strip()[:200]}")
+            return None
+        return proc.stdout
+
+    def _pptx(self, src, work, meta):
+        with zipfile.ZipFile(src) as z:
+            names = z.namelist()
+            slides = sorted((int(m.group(1)), n) for n in names if (m := _SLIDE.match(n)))
+            meta["pages"] = len(slides)
+            texts = []
+            for _, n in slides[:SNIPPET_SLIDES]:
+                texts += [html.unescape(t.decode("utf-8", "replace")) for t in _TEXT_RUN.findall(z.read(n))]
+            meta["text"] = _clip(" ".join(texts))
+            for n in ("docProps/thumbnail.jpeg", "docProps/thumbnail.png"):
+                if n in names:
+                    ext = ".jpg" if n.endswith(".jpeg") else ".png"
+                    with open(os.path.join(work, "thumb" + ext), "wb") as f:
+                        f.write(z.read(n))
+                    meta["thumb"] = ext
+                    return
+        # 내장 썸네일 없음 → LibreOffice로 첫 슬라이드 변환 (확장자로 형식을 알아보므로 링크를 만들어 넘긴다)
+        deck = os.path.join(work, "deck.pptx")
+        os.symlink(src, deck)
+        profile = f"-env:UserInstallation=file://{os.path.join(work, 'profile')}"   # 동시 실행 시 프로필 잠금 방지
+        if self._tool(meta, "soffice", profile, "--headless", "--convert-to", "png", "--outdir", work, deck) is not None:
+            if os.path.exists(os.path.join(work, "deck.png")):
+                os.replace(os.path.join(work, "deck.png"), os.path.join(work, "thumb.png"))
+                meta["thumb"] = ".png"
+
+    def _pdf(self, src, work, meta):
+        meta["pages"] = pdf_page_count(src)
+        if self._tool(meta, "pdftoppm", "-f", "1", "-l", "1", "-scale-to", str(THUMB_WIDTH), "-jpeg",
+                      "-singlefile", src, os.path.join(work, "thumb")) is not None:
+            meta["thumb"] = ".jpg"
+        text = self._tool(meta, "pdftotext", "-f", "1", "-l", "1", "-enc", "UTF-8", src, "-")
+        if text:
+            meta["text"] = _clip(text.decode("utf-8", "replace"))
+
+    # ── 정리 ──
+    def remove(self, sha256):
+        self._done.pop(sha256, None)
+        for suffix in (".json", ".jpg", ".png"):
+            try:
+                os.remove(self.path(sha256, suffix))
+            except FileNotFoundError:
+                pass
+
+    def prune(self, keep):
+        """keep(해시 집합)에 없는 미리보기 삭제. 삭제한 수 반환"""
+        removed = 0
+        for sub in sorted(os.listdir(self.root)):
+            subdir = os.path.join(self.root, sub)
+            if sub.startswith(".") or not os.path.isdir(subdir):
+                continue
+            for entry in os.listdir(subdir):
+                sha256, suffix = os.path.splitext(entry)
+                if suffix == ".json" and sha256 not in keep:
+                    self.remove(sha256)
+                    removed += 1
+        return removed
+
+
+def pdf_page_count(path):
+    """쪽수 — 페이지 트리 루트의 /Count (가장 큰 값), 없으면 /Type /Page 개수. 알 수 없으면 None"""
+    if not os.path.getsize(path):
+        return None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        counts = [int(a or b) for a, b in _PDF_PAGES.findall(data)]
+        if counts:
+            return max(counts)
+        return sum(1 for _ in _PDF_PAGE.finditer(data)) or None
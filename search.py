@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+🔎 강의자료·Q&A 검색 (워커 프로세스별 역색인)
+- 한글은 형태소 분석 없이도 찾을 수 있도록 글자 2-gram으로 색인 ("회로해석" → 회로/로해/해석)
+  한 글자 검색어("미")도 긴 단어 안에서 찾도록 글자 1-gram도 함께 색인한다
+- 쓰기 경로에 연결하지 않고 검색할 때 맞춘다(diff on read): 워커마다 색인이 따로라 다른 워커의 쓰기는
+  어차피 저장소에서 읽어야 하므로, 테이블 버전이 바뀐 테이블만 전체 행을 훑어 내용이 바뀐 문서만 다시 색인
+- BM25 점수(제목 가중) 순 정렬, 모든 검색어 단어를 포함한 문서만 결과로
+"""
+
+import math
+import re
+import threading
+import unicodedata
+
+_WORD = re.compile(r"\w+")
+TITLE_WEIGHT = 2   # 제목에 나온 검색어는 본문보다 2배로 센다
+K1, B = 1.2, 0.75  # BM25
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", str(text or "")).lower()
+
+
+def words(text):
+    return _WORD.findall(normalize(text))
+
+
+def grams(word):
+    """단어 → 2-gram 목록 (한 글자 단어는 그대로)"""
+    if len(word) < 2:
+        return [word]
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def index_grams(word):
+    """색인용 — 2-gram + 글자 1-gram (한 글자 검색어가 긴 단어 안에서도 일치하도록)"""
+    if len(word) < 2:
+        return [word]
+    return grams(word) + list(word)
+
+
+def tokenize(text):
+    return [g for w in words(text) for g in index_grams(w)]
+
+
+# 색인 대상: 종류 → (테이블, 문서로 바꾸는 함수)
+def _post_doc(row):
+    return {"title": row["title"], "body": row["content"], "date": row["date"]}
+
+
+def _question_doc(row):
+    return {"title": row["title"], "body": row["content"], "date": row["date"], "email": row["email"]}
+
+
+def _comment_doc(row):
+    return {"title": "", "body": row["comment"], "date": row["date"], "email": row["email"],
+            "question_id": row["question_id"]}
+
+
+SOURCES = {
+    "post": ("posts", _post_doc),
+    "question": ("questions", _question_doc),
+    "comment": ("comments", _comment_doc),
+}
+
+
+class SearchIndex:
+    """(종류, id) 문서에 대한 1·2-gram 역색인. sync(store)로 저장소 변경분을 반영한다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.docs = {}        # key → 문서 dict (+ "_sig", "_len", "_text")
+        self.postings = {}    # gram → {key: 가중 빈도}
+        self.versions = {}    # 종류 → 마지막으로 반영한 테이블 버전
+        self.total_len = 0
+
+    # ── 색인 갱신 ──
+    def _add(self, key, doc):
+        counts = {}
+        for g in tokenize(doc["title"]):
+            counts[g] = counts.get(g, 0) + TITLE_WEIGHT
+        for g in tokenize(doc["body"]):
+            counts[g] = counts.get(g, 0) + 1
+        for g, n in counts.items():
+            self.postings.setdefault(g, {})[key] = n
+        doc["_len"] = sum(counts.values())
+        doc["_text"] = normalize(doc["title"] + "\n" + doc["body"])
+        self.docs[key] = doc
+        self.total_len += doc["_len"]
+
+    def _remove(self, key):
+        doc = self.docs.pop(key)
+        self.total_len -= doc["_len"]
+        for g in set(tokenize(doc["title"]) + tokenize(doc["body"])):
+            bucket = self.postings.get(g)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.postings[g]
+
+    def sync(self, store):
+        """버전이 바뀐 테이블만 훑어 새 문서 추가, 내용이 바뀐 문서 재색인, 사라진 문서 제거. 반영한 문서 수 반환
+
+        검색 요청마다 호출된다 — 테이블이 그대로면 버전 비교만 하고, 바뀌었으면 그 테이블의 행을 한 번 훑는다.
+        """
+        changed = 0
+        with self._lock:
+            for kind, (table, to_doc) in SOURCES.items():
+                version = store.version(table)
+                if self.versions.get(kind) == version and version is not None:
+                    continue
+                seen = set()
+                for row in store.rows(table):
+                    key = (kind, row["id"])
+                    seen.add(key)
+                    doc = dict(to_doc(row), kind=kind, id=row["id"])
+                    doc["_sig"] = (doc["title"], doc["body"], doc["date"])
+                    old = self.docs.get(key)
+                    if old is not None and old["_sig"] == doc["_sig"]:
+                        continue
+                    if old is not None:
+                        self._remove(key)
+                    self._add(key, doc)
+                    changed += 1
+                for key in [k for k in self.docs if k[0] == kind and k not in seen]:
+                    self._remove(key)
+                    changed += 1
+                self.versions[kind] = version
+        return changed
+
+    # ── 검색 ──
+    def search(self, query, kinds=None, page=1, per_page=10, accept=None):
+        """(결과 목록, 전체 건수). accept(doc) → False 인 문서는 제외 (예: 보관 기간이 지난 게시자료)"""
+        terms = words(query)
+        query_grams = sorted({g for w in terms for g in grams(w)})
+        if not query_grams:
+            return [], 0
+        with self._lock:
+            buckets = [self.postings.get(g) for g in query_grams]
+            if not all(buckets):
+                return [], 0
+            buckets.sort(key=len)
+            candidates = set(buckets[0]).intersection(*buckets[1:])
+            n_docs = len(self.docs) or 1
+            avg_len = self.total_len / n_docs or 1
+            scored = []
+            for key in candidates:
+                doc = self.docs[key]
+                if kinds and doc["kind"] not in kinds:
+                    continue
+                if not all(t in doc["_text"] for t in terms):   # 2-gram이 흩어져 있는 경우 제외
+                    continue
+                if accept and not accept(doc):
+                    continue
+                score = 0.0
+                for g, bucket in zip(query_grams, [self.postings[g] for g in query_grams]):
+                    tf = bucket[key]
+                    idf = math.log(1 + (n_docs - len(bucket) + 0.5) / (len(bucket) + 0.5))
+                    score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * doc["_len"] / avg_len))
+                scored.append((score, doc["date"], doc))
+        scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+        start = (page - 1) * per_page
+        results = [
+            {k: v for k, v in doc.items() if not k.startswith("_")} | {
+                "score": round(score, 3), "snippet": snippet(doc["body"] or doc["title"], terms)}
+            for score, _, doc in scored[start:start + per_page]
+        ]
+        return results, len(scored)
+
+    def stats(self):
+        with self._lock:
+            return {"docs": len(self.docs), "grams": len(self.postings), "versions": dict(self.versions)}
+
+
+def snippet(text, terms, width=60):
+    """첫 일치 위치 주변 발췌 → [(글자열, 일치 여부), ...] (템플릿에서 강조 표시)"""
+    text = str(text or "")
+    low = normalize(text)
+    if len(low) != len(text):   # NFKC로 길이가 바뀌는 글자가 있으면 위치가 어긋나므로 소문자만
+        low = text.lower()
+    first = min((low.find(t) for t in terms if low.find(t) >= 0), default=0)
+    start = max(first - width // 2, 0)
+    part, low_part = text[start:start + width * 2], low[start:start + width * 2]
+    marks = [False] * len(part)
+    for t in terms:
+        i = low_part.find(t)
+        while t and i >= 0:
+            for j in range(i, min(i + len(t), len(part))):
+                marks[j] = True
+            i = low_part.find(t, i + len(t))
+    segments = []
+    for ch, m in zip(part, marks):
+        if segments and segments[-1][1] == m:
+            segments[-1][0] += ch
+        else:
+            segments.append([ch, m])
+    prefix = [["…", False]] if start else []
+    suffix = [["…", False]] if start + width * 2 < len(text) else []
+    return prefix + segments + suffix
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+🎫 서버 저장 세션 (SQLite)
+- 쿠키에는 서명된 세션 ID만 담고, 내용(email, role, flash 등)은 sessions 테이블에 둔다
+- 역할(role)은 로그인할 때 세션에 저장 → 요청마다 허용 목록을 다시 확인하지 않는다
+- 허용 목록이 바뀌면 해당 이메일의 세션 역할을 바로 갱신하거나 폐기할 수 있다 (set_role / revoke)
+- 만료된 세션은 sweep()으로 정리 (백그라운드 작업 / flask sweep-sessions)
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+def load_secret_key(path):
+    """SECRET_KEY 환경변수, 없으면 path 파일 (처음 실행 시 무작위로 만들어 워커들이 함께 사용)"""
+    key = os.environ.get("SECRET_KEY")
+    if key:
+        return key
+    if not os.path.exists(path):
+        # 임시 파일에 다 쓴 뒤 링크로 올린다 — 다른 워커가 빈 파일을 읽는 일이 없고, 먼저 올린 쪽의 키를 모두 쓴다
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".secret-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    with open(path, encoding="utf-8") as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"{path} 가 비어 있습니다 — 파일을 지우고 다시 시작하거나 SECRET_KEY 를 지정하세요")
+    return key
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, expires=0.0):
+        def on_update(s):
+            s.modified = True
+
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.modified = False
+        self.new = sid is None
+        self.rotate = False
+
+    def regenerate(self):
+        """로그인 직후 새 세션 ID 발급 (세션 고정 공격 방지)"""
+        self.rotate = True
+        self.modified = True
+
+
+class SessionStore:
+    """sid → (email, role, 내용 JSON, 만료 시각)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, email TEXT, role TEXT, "
+                "data TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_email ON sessions (email)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)")
+
+    def _conn(self):
+        # 스레드/프로세스(gunicorn fork)마다 별도 연결 (storage.SqliteStore와 같은 방식)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, 0.0)
+
+    def save(self, sid, data, expires):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO sessions (sid, email, role, data, expires) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET email = excluded.email, role = excluded.role, "
+                "data = excluded.data, expires = excluded.expires",
+                (sid, data.get("email"), data.get("role"), json.dumps(data, ensure_ascii=False), expires),
+            )
+
+    def touch(self, sid, expires):
+        with self._conn() as conn:
+            conn.execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires, sid))
+
+    def delete(self, sid):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def set_role(self, email, role):
+        """해당 이메일의 모든 세션 역할 변경. 바뀐 세션 수 반환"""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT sid, data FROM sessions WHERE email = ? AND role IS NOT ?", (email, role)
+            ).fetchall()
+            for sid, data in rows:
+                data = dict(json.loads(data), role=role)
+                conn.execute(
+                    "UPDATE sessions SET role = ?, data = ? WHERE sid = ?",
+                    (role, json.dumps(data, ensure_ascii=False), sid),
+                )
+        return len(rows)
+
+    def revoke(self, email=None):
+        """해당 이메일(없으면 전체)의 세션 폐기. 폐기한 세션 수 반환"""
+        with self._conn() as conn:
+            if email is None:
+                return conn.execute("DELETE FROM sessions").rowcount
+            return conn.execute("DELETE FROM sessions WHERE email = ?", (email,)).rowcount
+
+    def emails(self):
+        """세션이 남아 있는 이메일 목록"""
+        cur = self._conn().execute("SELECT DISTINCT email FROM sessions WHERE email IS NOT NULL")
+        return [e for (e,) in cur]
+
+    def sweep(self):
+        """만료된 세션 삭제. 삭제한 수 반환"""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),)).rowcount
+
+    def active(self):
+        """이메일별 활성 세션 수"""
+        cur = self._conn().execute(
+            "SELECT email, role, COUNT(*) FROM sessions WHERE expires > ? AND email IS NOT NULL "
+            "GROUP BY email, role ORDER BY email",
+            (time.time(),),
+        )
+        return [{"email": e, "role": r, "sessions": n} for e, r, n in cur]
+
+
+class SqliteSessionInterface(SessionInterface):
+    """Flask 세션 인터페이스 — 쿠키 = 서명된 sid, 만료는 PERMANENT_SESSION_LIFETIME (사용 중이면 연장)"""
+
+    serializer = None
+
+    def __init__(self, store, salt="hwat25-session"):
+        self.store = store
+        self.salt = salt
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data, expires = self.store.load(sid)
+                if data is not None:
+                    return ServerSession(data, sid, expires)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        if not session:
+            if session.sid and (session.modified or session.rotate):   # 로그아웃 등으로 비워진 세션
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        # 내용이 바뀌었거나 남은 시간이 절반 이하일 때만 저장 (읽기 요청마다 쓰지 않음)
+        refresh = session.expires - now < lifetime / 2
+        if not (session.modified or session.new or refresh):
+            return
+        if session.rotate and session.sid:
+            self.store.delete(session.sid)
+            session.sid = None
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires = now + lifetime
+        if session.modified or session.new:
+            self.store.save(session.sid, dict(session), session.expires)
+        else:
+            self.store.touch(session.sid, session.expires)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=session.expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
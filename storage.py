@@ -0,0 +1,891 @@
+# -*- coding: utf-8 -*-
+"""
+📦 화트25 데이터 저장소 계층
+- SqliteStore : SQLite(WAL) 기반 기본 저장소 (행 단위 삽입/수정/삭제)
+- CsvStore    : 기존 CSV 파일 방식 (호환용)
+두 저장소는 같은 인터페이스를 가지며, CSV 스키마(헤더)는 그대로 유지한다.
+여러 행을 한꺼번에 바꿀 때는 `with store.batch():` — SQLite는 트랜잭션 하나, CSV는 파일당 한 번만 저장.
+"""
+
+import bisect
+import csv
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+import metrics
+
+try:
+    import fcntl   # 워커 프로세스 간 파일 잠금 (Linux/Render)
+except ImportError:   # Windows 로컬 실행 시에는 스레드 잠금만 사용
+    fcntl = None
+
+log = logging.getLogger("hwat25.storage")
+
+
+# ───────────── 테이블 스키마 (기존 CSV 헤더와 동일) ─────────────
+SCHEMAS = {
+    "posts": ["title", "content", "files", "links", "date", "confirmed", "upload_id", "title_key"],
+    "uploads": ["title", "content", "files", "links", "date", "confirmed"],
+    "questions": ["id", "title", "content", "email", "date"],
+    "comments": ["question_id", "comment", "email", "date"],
+    "files": ["name", "sha256", "size", "date", "mtime"],   # 파일명 → 내용 해시 (uploads/.blobs)
+}
+INTEGER_COLUMNS = {"id", "question_id", "size", "upload_id"}
+
+
+def title_key(title):
+    """게시자료 제목 정규화 — '(수정)' 표시, 공백, 대소문자 차이를 무시"""
+    return " ".join(str(title).replace("(수정)", " ").split()).lower()
+
+
+# 나중에 추가된 열 — 예전 CSV 파일에 없으면 빈 값으로 읽는다
+ADDED_COLUMNS = {"upload_id", "title_key", "mtime"}
+
+# 쓰기 때마다 자동으로 채우는 열: 열 → (원본 열, 변환 함수)
+DERIVED_COLUMNS = {
+    "posts": {"title_key": ("title", title_key)},
+}
+
+# 조회 조건으로 자주 쓰이는 열 → SQLite 인덱스
+INDEXES = {
+    "posts": ["title_key, date", "date", "upload_id"],
+    "comments": ["question_id"],
+    "files": ["sha256"],
+}
+UNIQUE_INDEXES = {
+    "files": ["name"],
+}
+
+# Q&A 테이블은 모든 변경을 이벤트(추가 전용 로그)로 남기고, 읽기용 뷰는 새 이벤트만 반영해 갱신한다.
+EVENT_TABLES = ("questions", "comments")
+
+
+def columns(table):
+    """저장소 열 목록 ('id'는 항상 첫 번째)"""
+    return ["id"] + [c for c in SCHEMAS[table] if c != "id"]
+
+
+def _clean(table, row):
+    """스키마 외 열 제거 + 타입 정리 (정수 열은 int, 나머지는 str)"""
+    out = {}
+    for col in columns(table):
+        if col not in row:
+            continue
+        value = row[col]
+        if col in INTEGER_COLUMNS:
+            try:
+                value = int(float(value))
+            except (TypeError, ValueError):
+                value = None
+        else:
+            value = "" if value is None else str(value)
+        out[col] = value
+    for col, (src, fn) in DERIVED_COLUMNS.get(table, {}).items():
+        if src in out:
+            out[col] = fn(out[src])
+    return out
+
+
+def _values(row, cols):
+    """전체 행 INSERT용 값 — 행에 없는 열은 기본값 (텍스트 열은 NOT NULL이므로 "", 정수 열은 NULL)"""
+    return tuple(row.get(c, None if c in INTEGER_COLUMNS else "") for c in cols)
+
+
+def _check_unique(table, rows, row):
+    """UNIQUE_INDEXES 위반이면 sqlite3.IntegrityError — CSV 저장소도 SQLite와 같은 예외로 알린다"""
+    for index_cols in UNIQUE_INDEXES.get(table, []):
+        cols = [c.strip() for c in index_cols.split(",")]
+        key = tuple(row.get(c) for c in cols)
+        if any(r["id"] != row.get("id") and tuple(r.get(c) for c in cols) == key for r in rows):
+            raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {table}.{index_cols}")
+
+
+# ───────────── 파일 잠금 (스레드 + 프로세스) ─────────────
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+@contextmanager
+def file_lock(path):
+    """path에 대한 배타적 잠금 — 같은 워커의 스레드와 다른 gunicorn 워커 모두 대기시킨다
+
+    같은 스레드 안에서 다시 잡으면(예: 저장소 쓰기 → save_csv) 그대로 통과한다.
+    """
+    key = os.path.abspath(path)
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    if key in held:
+        yield
+        return
+    with _thread_locks_guard:
+        tlock = _thread_locks.setdefault(key, threading.Lock())
+    with tlock, _process_lock(path):
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+
+
+@contextmanager
+def _process_lock(path):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lf:
+        fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+
+# ───────────── CSV 로드/저장 ─────────────
+class CsvCorruptError(Exception):
+    """CSV와 직전 스냅샷(.bak) 모두 읽을 수 없음 — 빈 표로 덮어쓰지 않도록 중단"""
+
+
+def snapshot_path(path):
+    return path + ".bak"
+
+
+def _read_csv(path, cols):
+    """읽기 실패/헤더 불일치 시 ValueError"""
+    if os.path.getsize(path) == 0:   # 내용 없는 예전 파일 = 빈 표
+        return []
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            records = list(reader)
+    except csv.Error as e:
+        raise ValueError(e) from e
+    if not set(cols) - ADDED_COLUMNS <= set(header):
+        raise ValueError(f"헤더 불일치 {header}")
+    keep = (["id"] if "id" in header and "id" not in cols else []) + cols
+    rows = []
+    for n, rec in enumerate(records, start=2):
+        if None in rec:   # 헤더보다 칸이 많은 줄 = 깨진 파일
+            raise ValueError(f"{n}번째 줄: 열 개수 불일치")
+        rows.append({c: rec.get(c) or "" for c in keep})
+    return rows
+
+
+@metrics.timed("hwat25_storage_seconds", op="load_csv")
+def load_csv(path, cols):
+    """CSV 안전 로드 → 행(dict, 값은 모두 str) 목록 ('id' 열이 있으면 함께 반환)
+
+    파일이 깨졌으면 마지막으로 정상 저장된 스냅샷(.bak)에서 복구하고,
+    그것도 없으면 빈 표를 돌려주는 대신 CsvCorruptError를 낸다.
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        return _read_csv(path, cols)
+    except ValueError as e:
+        log.error("CSV 읽기 실패", extra={"path": path, "error": str(e)})
+    backup = snapshot_path(path)
+    if os.path.exists(backup):
+        try:
+            rows = _read_csv(backup, cols)
+            log.warning("CSV 스냅샷에서 복구", extra={"path": path, "snapshot": backup, "rows": len(rows)})
+            return rows
+        except ValueError as e:
+            log.error("CSV 스냅샷 읽기 실패", extra={"path": backup, "error": str(e)})
+    raise CsvCorruptError(path)
+
+
+@metrics.timed("hwat25_storage_seconds", op="save_csv")
+def save_csv(path, cols, rows):
+    """임시 파일 → fsync → os.replace 로 원자적 저장 (파일 잠금 안에서)
+
+    읽는 쪽은 항상 이전 파일 전체 또는 새 파일 전체만 보게 되고,
+    교체 직전 파일은 스냅샷(.bak)으로 남겨 load_csv 복구에 쓴다.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    with file_lock(path):
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                # 현재 파일을 스냅샷으로 (하드링크 후 교체 → 복사 없이 원자적)
+                link = tmp + ".bak"
+                os.link(path, link)
+                os.replace(link, snapshot_path(path))
+            os.replace(tmp, path)
+        except BaseException:
+            for leftover in (tmp, tmp + ".bak"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(folder, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+def read_rows(path, table):
+    """CSV 파일 → 행(dict) 목록. 'id' 열이 없던 예전 파일은 1부터 번호를 매긴다."""
+    rows = [_clean(table, r) for r in load_csv(path, SCHEMAS[table])]
+    next_id = max((r["id"] for r in rows if r.get("id")), default=0) + 1
+    for r in rows:
+        if not r.get("id"):
+            r["id"] = next_id
+            next_id += 1
+    return rows
+
+
+def write_rows(path, table, rows):
+    """행(dict) 목록 → CSV 파일 (열 순서: id + 기존 스키마)"""
+    save_csv(path, columns(table), [_clean(table, r) for r in rows])
+
+
+# ───────────── Q&A 이벤트 ─────────────
+def make_event(table, op, row_id=None, row=None):
+    """op: insert / update (변경 후 전체 행) · delete · reset (테이블 전체 교체)"""
+    return {
+        "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "table": table,
+        "op": op,
+        "id": row_id,
+        "row": row,
+    }
+
+
+def apply_event(view, event):
+    """id → 행 dict에 이벤트 1건 반영 (같은 이벤트를 다시 적용해도 결과가 같다)"""
+    if event["op"] == "delete":
+        view.pop(event["id"], None)
+    elif event["op"] in ("insert", "update"):
+        view[event["id"]] = event["row"]
+
+
+# ───────────── 읽기 캐시 (워커 프로세스별) ─────────────
+class RowCache:
+    """테이블별 행 목록 캐시. 저장소 버전이 같으면 다시 읽지 않는다.
+
+    반환된 행은 여러 요청이 공유하므로 호출하는 쪽에서 수정하면 안 된다.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # table → (version, rows, size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, table, version, loader):
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(table)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        rows = loader()
+        size = sum(100 + sum(len(str(v)) for v in r.values()) for r in rows)
+        with self._lock:
+            self._entries.pop(table, None)
+            if size <= self.max_bytes:
+                self._entries[table] = (version, rows, size)
+                # 용량 초과 시 가장 오래 안 쓴 테이블부터 제거
+                while sum(e[2] for e in self._entries.values()) > self.max_bytes:
+                    self._entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "bytes": sum(e[2] for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "tables": {t: {"version": e[0], "rows": len(e[1])} for t, e in self._entries.items()},
+            }
+
+
+# ───────────── SQLite 저장소 ─────────────
+class SqliteStore:
+    """SQLite(WAL) 저장소 — 삽입/수정/삭제는 행 단위 트랜잭션 1회"""
+
+    backend = "sqlite"
+
+    def __init__(self, path, cache_bytes=32 * 1024 * 1024):
+        self.path = path
+        self._local = threading.local()
+        self.cache = RowCache(cache_bytes)
+        self._views = {}                 # Q&A 테이블: table → (마지막 이벤트 seq, id → 행)
+        self._views_lock = threading.Lock()
+        self._init_schema()
+
+    def _conn(self):
+        # 스레드/프로세스(gunicorn fork)마다 별도 연결 사용
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")   # 여러 워커가 동시에 기동해도 열 추가는 한 번만
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for table in SCHEMAS:
+                cols = []
+                for col in columns(table):
+                    if col == "id":
+                        cols.append("id INTEGER PRIMARY KEY AUTOINCREMENT")
+                    elif col in INTEGER_COLUMNS:
+                        cols.append(f"{col} INTEGER")
+                    else:
+                        cols.append(f"{col} TEXT NOT NULL DEFAULT ''")
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(cols)})")
+                self._migrate_columns(conn, table, cols)
+                for i, index_cols in enumerate(INDEXES.get(table, [])):
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{i} ON {table} ({index_cols})")
+                for i, index_cols in enumerate(UNIQUE_INDEXES.get(table, [])):
+                    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uniq_{table}_{i} ON {table} ({index_cols})")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "ts TEXT, tbl TEXT, op TEXT, row_id INTEGER, data TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_tbl ON events (tbl, seq)")
+
+    def _migrate_columns(self, conn, table, col_defs):
+        """예전 DB에 없는 열 추가 + 파생 열(DERIVED_COLUMNS) 채우기"""
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        added = [d for d in col_defs if d.split()[0] not in existing]
+        for col_def in added:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
+        added_names = {d.split()[0] for d in added}
+        for col, (src, fn) in DERIVED_COLUMNS.get(table, {}).items():
+            if col not in added_names:
+                continue
+            rows = conn.execute(f"SELECT id, {src} FROM {table}").fetchall()
+            conn.executemany(f"UPDATE {table} SET {col} = ? WHERE id = ?", [(fn(r[src]), r["id"]) for r in rows])
+        if added:
+            self._bump(conn, table)
+
+    def journal_mode(self):
+        return self._conn().execute("PRAGMA journal_mode").fetchone()[0]
+
+    # ── 일괄 작업 ──
+    @contextmanager
+    def batch(self):
+        """안의 모든 쓰기를 트랜잭션 하나로 (예외가 나면 전부 취소). 중첩되면 바깥 트랜잭션에 합쳐진다."""
+        conn = self._conn()
+        if getattr(self._local, "batch", False):
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.batch = True
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # 트랜잭션 안에서 읽은(취소된) 행이 캐시에 남지 않도록
+            self.cache.clear()
+            with self._views_lock:
+                self._views.clear()
+            raise
+        finally:
+            self._local.batch = False
+
+    @contextmanager
+    def _tx(self):
+        """쓰기 1건의 트랜잭션 — batch() 안이면 바깥 트랜잭션을 그대로 쓴다"""
+        conn = self._conn()
+        if getattr(self._local, "batch", False):
+            yield conn
+            return
+        with conn:
+            yield conn
+
+    # ── 조회 ──
+    def version(self, table):
+        """테이블 쓰기 횟수 (같은 트랜잭션에서 증가하므로 워커 간에도 일관됨)"""
+        r = self._conn().execute("SELECT value FROM meta WHERE key = ?", (f"version:{table}",)).fetchone()
+        return int(r[0]) if r else 0
+
+    def rows(self, table):
+        """전체 행 (읽기 전용, 캐시 사용)"""
+        loader = self._materialize if table in EVENT_TABLES else self._select_all
+        return self.cache.get(table, self.version(table), lambda: loader(table))
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_select")
+    def _select_all(self, table):
+        cur = self._conn().execute(f"SELECT * FROM {table} ORDER BY id")
+        return [dict(r) for r in cur]
+
+    def _materialize(self, table):
+        """Q&A 뷰 갱신 — 마지막으로 본 이후의 이벤트만 읽어 반영 (reset이 있으면 전체 다시 읽기)"""
+        conn = self._conn()
+        with self._views_lock:
+            seq, view = self._views.get(table, (None, None))
+            events = []
+            if seq is not None:
+                events = conn.execute(
+                    "SELECT seq, op, row_id, data FROM events WHERE tbl = ? AND seq > ? ORDER BY seq",
+                    (table, seq),
+                ).fetchall()
+            if seq is None or any(e["op"] == "reset" for e in events):
+                # 행과 마지막 seq를 같은 읽기 스냅샷에서 — sqlite3 모듈은 SELECT만으로는 트랜잭션을 열지 않으므로
+                # 직접 BEGIN 한다 (WAL: 첫 SELECT 시점으로 고정). batch() 안이면 이미 열린 트랜잭션을 쓴다.
+                own = not conn.in_transaction
+                if own:
+                    conn.execute("BEGIN")
+                try:
+                    last = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE tbl = ?", (table,)).fetchone()[0]
+                    view = {r["id"]: r for r in self._select_all(table)}
+                finally:
+                    if own:
+                        conn.execute("COMMIT")
+            else:
+                view = dict(view)
+                last = seq
+                for e in events:
+                    apply_event(view, {"op": e["op"], "id": e["row_id"], "row": json.loads(e["data"]) if e["data"] else None})
+                    last = e["seq"]
+            self._views[table] = (last, view)
+            return sorted(view.values(), key=lambda r: r["id"]) if events else list(view.values())
+
+    def events(self, table=None, limit=100):
+        """최근 Q&A 변경 이력 (오래된 것부터)"""
+        cond, params = ("WHERE tbl = ?", (table,)) if table else ("", ())
+        cur = self._conn().execute(
+            f"SELECT seq, ts, tbl, op, row_id, data FROM events {cond} ORDER BY seq DESC LIMIT ?", params + (limit,)
+        )
+        return [
+            {"seq": r["seq"], "ts": r["ts"], "table": r["tbl"], "op": r["op"], "id": r["row_id"],
+             "row": json.loads(r["data"]) if r["data"] else None}
+            for r in reversed(cur.fetchall())
+        ]
+
+    def get(self, table, row_id):
+        cur = self._conn().execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,))
+        r = cur.fetchone()
+        return dict(r) if r else None
+
+    def find(self, table, **where):
+        cond = " AND ".join(f"{k} IS ?" for k in where) or "1"   # IS: None(NULL)도 비교 가능
+        cur = self._conn().execute(f"SELECT * FROM {table} WHERE {cond} ORDER BY id", tuple(where.values()))
+        return [dict(r) for r in cur]
+
+    # ── 쓰기 (모든 쓰기는 같은 트랜잭션에서 테이블 버전을 올리고, Q&A는 이벤트도 남긴다) ──
+    @staticmethod
+    def _bump(conn, table):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (f"version:{table}",),
+        )
+
+    def _changed(self, conn, table, op, row_id=None):
+        self._bump(conn, table)
+        if table not in EVENT_TABLES:
+            return
+        row = None
+        if op in ("insert", "update"):
+            row = dict(conn.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,)).fetchone())
+        e = make_event(table, op, row_id, row)
+        conn.execute(
+            "INSERT INTO events (ts, tbl, op, row_id, data) VALUES (?, ?, ?, ?, ?)",
+            (e["ts"], table, op, row_id, json.dumps(row, ensure_ascii=False) if row else None),
+        )
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_write")
+    def insert(self, table, row):
+        row = _clean(table, row)
+        row.pop("id", None)
+        with self._tx() as conn:
+            cur = conn.execute(
+                f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values()),
+            )
+            self._changed(conn, table, "insert", cur.lastrowid)
+        return cur.lastrowid
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_write")
+    def update(self, table, row_id, fields):
+        fields = _clean(table, fields)
+        fields.pop("id", None)
+        if not fields:
+            return False
+        with self._tx() as conn:
+            cur = conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                tuple(fields.values()) + (row_id,),
+            )
+            if cur.rowcount:
+                self._changed(conn, table, "update", row_id)
+        return cur.rowcount > 0
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_write")
+    def delete(self, table, row_id):
+        with self._tx() as conn:
+            cur = conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+            if cur.rowcount:
+                self._changed(conn, table, "delete", row_id)
+        return cur.rowcount > 0
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_write")
+    def prune_before(self, table, column, cutoff):
+        """column 값이 cutoff보다 앞선(문자열 비교) 행 삭제 — 삭제된 행이 있을 때만 쓰기 발생"""
+        with self._tx() as conn:
+            cur = conn.execute(f"DELETE FROM {table} WHERE {column} < ?", (cutoff,))
+            if cur.rowcount:
+                self._changed(conn, table, "reset")
+        return cur.rowcount
+
+    @metrics.timed("hwat25_storage_seconds", op="sqlite_write")
+    def replace_all(self, table, rows):
+        """테이블 전체 교체 (CSV 가져오기 전용)"""
+        rows = [_clean(table, r) for r in rows]
+        cols = columns(table)
+        with self._tx() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                [_values(r, cols) for r in rows],
+            )
+            self._changed(conn, table, "reset")
+
+    def import_csv_once(self, csv_paths):
+        """DB가 처음 만들어질 때 한 번만 기존 CSV 데이터를 옮겨온다 (워커 동시 기동 대비)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone()
+            if not done:
+                for table, path in csv_paths.items():
+                    rows = [_clean(table, r) for r in read_rows(path, table)]
+                    cols = columns(table)
+                    conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                        [_values(r, cols) for r in rows],
+                    )
+                    self._changed(conn, table, "reset")
+                conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', '1')")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+# ───────────── CSV 저장소 (기존 방식 호환) ─────────────
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class CsvStore:
+    """테이블 하나 = CSV 파일 하나. 모든 쓰기는 파일 잠금 안에서 한다.
+
+    Q&A 테이블(EVENT_TABLES)은 CSV를 다시 쓰지 않고 <이름>_events.jsonl 에 이벤트 한 줄만 추가한다.
+    CSV는 마지막 압축(compact) 시점의 스냅샷이며, 이벤트가 compact_every건 쌓이면 다시 저장하고
+    처리된 이벤트는 <이름>_events.archive.jsonl 로 옮겨 변경 이력으로 보관한다.
+    """
+
+    backend = "csv"
+
+    def __init__(self, csv_paths, cache_bytes=32 * 1024 * 1024, compact_every=500):
+        self.paths = dict(csv_paths)
+        self.cache = RowCache(cache_bytes)
+        self.compact_every = compact_every
+        self._views = {}     # table → {"stamp": CSV 상태, "offset": 읽은 로그 바이트, "count": 이벤트 수, "rows": id → 행}
+        self._views_lock = threading.Lock()
+        self._local = threading.local()   # batch() 중인 스레드의 저장 대기 행 (table → rows)
+
+    def log_path(self, table):
+        return os.path.splitext(self.paths[table])[0] + "_events.jsonl"
+
+    def archive_path(self, table):
+        return os.path.splitext(self.paths[table])[0] + "_events.archive.jsonl"
+
+    def seq_path(self, table):
+        return self.paths[table] + ".seq"
+
+    def _logged_max(self, table):
+        """이벤트 로그(보관분 포함)에 남은 가장 큰 id — .seq 파일이 없던 예전 데이터용"""
+        top = 0
+        for path in (self.archive_path(table), self.log_path(table)):
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    top = max([top] + [json.loads(line)["id"] or 0 for line in f if line.strip()])
+        return top
+
+    def _next_id(self, table, live_max):
+        """새 id (파일 잠금 안에서) — 지금까지 발급한 가장 큰 id를 <csv>.seq 에 남겨,
+        가장 최근 행을 지워도 그 id를 다시 쓰지 않는다 (SQLite AUTOINCREMENT와 같은 규칙)"""
+        path = self.seq_path(table)
+        try:
+            with open(path, encoding="utf-8") as f:
+                last = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            last = 0
+        row_id = max(last, live_max) + 1
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".seq")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(str(row_id))
+        os.replace(tmp, path)
+        return row_id
+
+    def version(self, table):
+        """파일 (mtime, 크기) — 다른 워커가 다시 저장하거나 이벤트를 추가하면 바뀐다"""
+        if table in EVENT_TABLES:
+            return (_stat(self.paths[table]), _stat(self.log_path(table)))
+        return _stat(self.paths[table])
+
+    # ── 일괄 작업 ──
+    @contextmanager
+    def batch(self):
+        """모든 CSV를 잠근 채 안의 쓰기를 메모리에 모았다가, 바뀐 파일만 끝날 때 한 번씩 저장 (예외 시 저장 안 함).
+
+        Q&A 테이블은 원래대로 이벤트 로그에 바로 추가된다.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        with ExitStack() as stack:
+            for table in sorted(self.paths):   # 항상 같은 순서로 잠가 워커 간 교착 방지
+                stack.enter_context(file_lock(self.paths[table]))
+            self._local.pending = {}
+            try:
+                yield
+                for table, rows in self._local.pending.items():
+                    write_rows(self.paths[table], table, rows)
+            finally:
+                self._local.pending = None
+
+    def _load(self, table):
+        """쓰기용 전체 행 — batch() 중이면 저장 대기 중인 행"""
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            return read_rows(self.paths[table], table)
+        if table not in pending:
+            pending[table] = read_rows(self.paths[table], table)
+        return pending[table]
+
+    def _save(self, table, rows):
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            write_rows(self.paths[table], table, rows)
+        else:
+            pending[table] = rows   # batch()가 끝날 때 저장
+
+    def rows(self, table):
+        """전체 행 (읽기 전용, 캐시 사용)"""
+        pending = getattr(self._local, "pending", None)
+        if pending and table in pending:
+            return pending[table]
+        if table in EVENT_TABLES:
+            return self.cache.get(table, self.version(table), lambda: list(self._materialize(table).values()))
+        return self.cache.get(table, self.version(table), lambda: read_rows(self.paths[table], table))
+
+    def _materialize(self, table):
+        """스냅샷 CSV + 이벤트 로그 → id → 행. 스냅샷이 그대로면 로그의 새 부분만 읽는다."""
+        path, log = self.paths[table], self.log_path(table)
+        with self._views_lock:
+            stamp = _stat(path)
+            view = self._views.get(table)
+            log_size = os.path.getsize(log) if os.path.exists(log) else 0
+            if view is None or view["stamp"] != stamp or log_size < view["offset"]:
+                view = {"stamp": stamp, "offset": 0, "count": 0, "rows": {r["id"]: r for r in read_rows(path, table)}}
+            if log_size > view["offset"]:
+                rows = dict(view["rows"])
+                with open(log, "rb") as f:
+                    f.seek(view["offset"])
+                    data = f.read(log_size - view["offset"])
+                end = data.rfind(b"\n") + 1   # 쓰는 중인 마지막 줄은 다음에 읽는다
+                for line in data[:end].splitlines():
+                    if line.strip():
+                        apply_event(rows, json.loads(line))
+                        view["count"] += 1
+                view = dict(view, offset=view["offset"] + end, rows=dict(sorted(rows.items())))
+            self._views[table] = view
+            return view["rows"]
+
+    @metrics.timed("hwat25_storage_seconds", op="csv_append")
+    def _append_event(self, table, event):
+        with open(self.log_path(table), "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._views[table]["count"] + 1 >= self.compact_every:
+            self.compact(table)
+
+    def compact(self, table):
+        """이벤트를 반영한 뷰를 CSV 스냅샷으로 저장하고, 처리된 로그는 보관 파일로 옮긴다"""
+        if table not in EVENT_TABLES:
+            return 0
+        with file_lock(self.paths[table]):
+            rows = self._materialize(table)
+            log = self.log_path(table)
+            if not os.path.exists(log) or os.path.getsize(log) == 0:
+                return 0
+            write_rows(self.paths[table], table, list(rows.values()))
+            # 스냅샷 저장 후 로그 정리 — 중간에 멈춰도 이벤트 재적용 결과가 같으므로 안전
+            with open(log, "rb") as src, open(self.archive_path(table), "ab") as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            n = self._views[table]["count"]
+            os.truncate(log, 0)
+        return n
+
+    def events(self, table=None, limit=100):
+        """최근 Q&A 변경 이력 (보관 로그 + 현재 로그, 오래된 것부터)"""
+        lines = []
+        for t in ([table] if table else EVENT_TABLES):
+            for path in (self.archive_path(t), self.log_path(t)):
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        lines += [json.loads(line) for line in f if line.strip()]
+        lines.sort(key=lambda e: e["ts"])
+        return lines[-limit:]
+
+    def get(self, table, row_id):
+        row = next((r for r in self.rows(table) if r["id"] == row_id), None)
+        return dict(row) if row else None
+
+    def find(self, table, **where):
+        where = _clean(table, where)
+        return [dict(r) for r in self.rows(table) if all(r.get(k) == v for k, v in where.items())]
+
+    def insert(self, table, row):
+        with file_lock(self.paths[table]):
+            if table in EVENT_TABLES:
+                rows = self._materialize(table)
+                row = _clean(table, row)
+                row = dict({c: "" for c in columns(table)}, **row)
+                # 지워진 질문/댓글의 id도 다시 쓰지 않는다 (댓글 question_id, ?after= 커서가 엉뚱한 글을 가리키지 않도록)
+                live_max = max(rows, default=0)
+                if not os.path.exists(self.seq_path(table)):
+                    live_max = max(live_max, self._logged_max(table))
+                row["id"] = self._next_id(table, live_max)
+                self._append_event(table, make_event(table, "insert", row["id"], row))
+                return row["id"]
+            rows = self._load(table)
+            row = _clean(table, row)
+            _check_unique(table, rows, row)
+            row["id"] = self._next_id(table, max((r["id"] for r in rows), default=0))
+            rows.append(row)
+            self._save(table, rows)
+        return row["id"]
+
+    def update(self, table, row_id, fields):
+        fields = _clean(table, fields)
+        fields.pop("id", None)
+        with file_lock(self.paths[table]):
+            if table in EVENT_TABLES:
+                current = self._materialize(table).get(row_id)
+                if current is None:
+                    return False
+                self._append_event(table, make_event(table, "update", row_id, dict(current, **fields)))
+                return True
+            rows = self._load(table)
+            for r in rows:
+                if r["id"] == row_id:
+                    _check_unique(table, rows, dict(r, **fields))
+                    r.update(fields)
+                    self._save(table, rows)
+                    return True
+        return False
+
+    def delete(self, table, row_id):
+        with file_lock(self.paths[table]):
+            if table in EVENT_TABLES:
+                if row_id not in self._materialize(table):
+                    return False
+                self._append_event(table, make_event(table, "delete", row_id))
+                return True
+            rows = self._load(table)
+            kept = [r for r in rows if r["id"] != row_id]
+            if len(kept) == len(rows):
+                return False
+            self._save(table, kept)
+        return True
+
+    def prune_before(self, table, column, cutoff):
+        with file_lock(self.paths[table]):
+            rows = self._load(table)
+            kept = [r for r in rows if not r[column] < cutoff]
+            if len(kept) < len(rows):
+                self._save(table, kept)
+        return len(rows) - len(kept)
+
+    def replace_all(self, table, rows):
+        with file_lock(self.paths[table]):
+            if table in EVENT_TABLES:
+                self.compact(table)
+                write_rows(self.paths[table], table, rows)
+            else:
+                self._save(table, [_clean(table, r) for r in rows])
+
+    def import_csv_once(self, csv_paths):
+        pass
+
+
+# ───────────── 저장소 선택 / 가져오기·내보내기 ─────────────
+def open_store(backend, db_path, csv_paths, cache_bytes=32 * 1024 * 1024):
+    """STORAGE_BACKEND 설정에 맞는 저장소 생성 (sqlite 최초 실행 시 CSV 자동 이전)"""
+    if backend == "csv":
+        return CsvStore(csv_paths, cache_bytes)
+    if backend != "sqlite":
+        raise ValueError(f"지원하지 않는 저장소: {backend}")
+    store = SqliteStore(db_path, cache_bytes)
+    store.import_csv_once(csv_paths)
+    return store
+
+
+def rows_after(store, table, after=0, limit=None):
+    """id가 after보다 큰 행을 id 순으로 limit개 (커서 기반 페이지 조회, 캐시된 행에서 이진 탐색)"""
+    rows = store.rows(table)
+    start = bisect.bisect_right(rows, after, key=lambda r: r["id"])
+    return rows[start:start + limit] if limit else rows[start:]
+
+
+def import_csv(store, table, path):
+    rows = read_rows(path, table)
+    store.replace_all(table, rows)
+    return len(rows)
+
+
+def export_csv(store, table, path):
+    rows = store.rows(table)
+    write_rows(path, table, rows)
+    return len(rows)
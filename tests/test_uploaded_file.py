@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""/uploads/<이름> — 숨김 폴더(.blobs 등)와 '..' 경로로 업로드 폴더 밖을 읽을 수 없어야 한다"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def hwat(tmp_path_factory):
+    # app은 import 시점의 작업 폴더 기준으로 저장소·업로드 폴더를 만든다
+    workdir = tmp_path_factory.mktemp("hwat25")
+    shutil.copy(os.path.join(ROOT, "allowed_emails.txt"), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    try:
+        import app
+        app.app.config["TESTING"] = True
+        with open(os.path.join(app.BLOB_FOLDER, ".scan.json"), "w", encoding="utf-8") as f:
+            f.write('{"stray": []}')
+        with open(os.path.join(app.UPLOAD_FOLDER, "legacy.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4")
+        yield app
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize("path", [
+    "/uploads/.blobs/.scan.json",
+    "/uploads/x/../.blobs/.scan.json",
+    "/uploads/x%2F..%2F.blobs%2F.scan.json",
+    "/uploads/x/..%2F.blobs/.scan.json",
+    "/uploads/x\\..\\.blobs\\.scan.json",
+])
+def test_hidden_paths_are_not_served(hwat, path):
+    resp = hwat.app.test_client().get(path)
+    assert resp.status_code == 302
+    assert b"stray" not in resp.data
+
+
+def test_legacy_file_is_served(hwat):
+    resp = hwat.app.test_client().get("/uploads/legacy.pdf")
+    assert resp.status_code == 200
+    assert resp.data == b"%PDF-1.4"